@@ -0,0 +1,302 @@
+"""
+Benchmarks of the lab hot paths on seeded synthetic data.
+
+Every case runs in its own process, so its peak RSS is not mixed up with the
+other cases. Results (seconds and rows per second of every step, peak RSS) are
+written to a JSON file per run, to compare runs over time:
+    python benchmarks.py                          # all cases, default sizes
+    python benchmarks.py lab2 lab3 --scale 0.1    # selected cases, 10% of the rows
+    python benchmarks.py --generate-lw2 big_LW2.txt --rows 5000000
+    python benchmarks.py --generate-lw3 big_LW3.xlsx --rows 2000000
+
+Generated grade books are saved through gradebook.storage.save_table, so the scripts read
+them from the columnar cache (Excel holds at most 1,048,576 rows).
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Rows of the synthetic data per case, multiplied by --scale
+DEFAULT_ROWS = {"lab2": 1_000_000, "lab3": 1_000_000, "lab4": 200_000, "lab6": 2_000}
+SUBJECTS = ["Discrete Mathematics", "Higher Mathematics", "English Language",
+            "Elective Discipline 1", "Elective Discipline 2"]
+SCHOLARSHIP_HINT = "Scholarship (mark * if average score is in top 60%)"
+
+SYLLABLES = np.array(["ко", "ва", "лен", "ен", "ро", "ми", "шев", "чук", "да", "ни", "то", "сла",
+                      "ан", "ол", "ер", "ук", "ти", "бой", "гор", "ма"])
+FIRST_NAMES = np.array(["Олександр", "Анастасія", "Владислав", "Марія", "Дмитро", "Олена", "Андрій",
+                        "Софія", "Іван", "Юлія", "Максим", "Катерина", "Богдан", "Ірина", "Тарас"])
+
+def random_names(rng, count):
+    """Names as "Surname Name" with 3-5 syllable surnames, a few repeated by chance"""
+    surnames = SYLLABLES[rng.integers(0, len(SYLLABLES), count)]
+    for _ in range(2):
+        surnames = np.char.add(surnames, SYLLABLES[rng.integers(0, len(SYLLABLES), count)])
+    extra = rng.random(count) < 0.7
+    surnames[extra] = np.char.add(surnames[extra], SYLLABLES[rng.integers(0, len(SYLLABLES), int(extra.sum()))])
+    surnames = np.char.capitalize(surnames)
+    return np.char.add(np.char.add(surnames, " "), FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), count)])
+
+# Synthetic data
+def generate_lw2(path, rows, seed=0, noise=0.05):
+    """Writes an LW2.txt-like TSV (ПІБ, ріст, вага) with noisy rows.
+
+    About noise of the rows get odd case and spaces in names, letters inside numbers,
+    non-numeric values, broken lines or extra columns.
+    """
+    rng = np.random.default_rng(seed)
+    pick = random.Random(seed)
+    names = random_names(rng, rows).tolist()
+    heights = rng.integers(140, 210, rows).tolist()
+    weights = rng.integers(40, 150, rows).tolist()
+    noisy = (rng.random(rows) < noise).tolist()
+    with open(path, "w", encoding="utf-8", newline="\n") as file:
+        file.write("ПІБ\tріст\tвага\n")
+        lines = []
+        for name, height, weight, is_noisy in zip(names, heights, weights, noisy):
+            height, weight = str(height), str(weight)
+            if is_noisy:
+                kind = pick.randrange(6)
+                if kind == 0:
+                    name = f"  {name.upper()} "
+                elif kind == 1:
+                    height = height[:1] + "і" + height[1:]
+                elif kind == 2:
+                    weight = f" {weight}кг"
+                elif kind == 3:
+                    weight = "н/д"
+                elif kind == 4:
+                    lines.append(f"{name}\n")
+                    continue
+                else:
+                    lines.append(f"{name}\t{height}\t{weight}\t{pick.randint(1, 9)}\n")
+                    continue
+            lines.append(f"{name.lower() if pick.random() < noise else name}\t{height}\t{weight}\n")
+            if len(lines) >= 100_000:
+                file.writelines(lines)
+                lines.clear()
+        file.writelines(lines)
+    return path
+
+def generate_grade_book(rows, groups=None, seed=0, noise=0.02):
+    """LW3_english.xlsx-like frame: names, groups, points and empty national scale columns.
+
+    Noise: missing or text grades, duplicated names and numeric group names.
+    """
+    rng = np.random.default_rng(seed)
+    groups = groups or max(rows // 50, 1)
+    group_names = np.array([f"{rng.integers(1, 7)}{rng.integers(30, 50)}{chr(97 + i % 26)}{i // 26 or ''}"
+                            for i in range(groups)], dtype=object)
+    group_names[::10] = [int(rng.integers(300, 700)) for _ in group_names[::10]]  # groups stored as numbers
+    names = random_names(rng, rows).astype(object)
+    duplicates = np.flatnonzero(rng.random(rows) < noise / 2)
+    names[duplicates] = names[rng.integers(0, rows, len(duplicates))]
+    frame = {"Name": names, "Group": group_names[rng.integers(0, groups, rows)]}
+    for subject in SUBJECTS:
+        points = rng.integers(55, 101, rows).astype(object)
+        missing = rng.random(rows) < noise
+        points[missing] = None
+        text = np.flatnonzero(rng.random(rows) < noise / 4)
+        points[text] = [f"{value} б." for value in rng.integers(60, 101, len(text))]
+        frame[f"{subject} (points)"] = points
+        frame[f"{subject} (national scale)"] = np.full(rows, np.nan)
+    frame[SCHOLARSHIP_HINT] = np.full(rows, np.nan)
+    return pd.DataFrame(frame)
+
+def write_grade_book(path, rows, seed=0):
+    """Saves a generated grade book through the columnar cache (and Excel when it fits)"""
+    from gradebook.storage import save_table
+    save_table(generate_grade_book(rows, seed=seed), path, excel=rows < 1_000_000)
+    return path
+
+# Measurement helpers
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where resource is missing)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def timed(steps, name, rows, function, *args):
+    """Runs function(*args), records seconds and rows per second under steps[name]"""
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    steps[name] = {"seconds": round(seconds, 4), "rows": rows,
+                   "rows_per_s": round(rows / seconds, 1) if seconds else None}
+    return result
+
+# Cases: each returns {step: timing} and runs in a child process
+def bench_lab2(rows, seed, work_dir):
+    import lab2
+    path = generate_lw2(os.path.join(work_dir, "LW2.txt"), rows, seed)
+    steps = {}
+    data = timed(steps, "parse_data", rows, lab2.parse_data, path)
+    cleaned = timed(steps, "clean_data", len(data), lab2.clean_data, data)
+    scored = timed(steps, "calculate_bmi", len(cleaned), lab2.calculate_bmi, cleaned)
+    timed(steps, "analyze_data", len(scored), lab2.analyze_data, scored)
+    timed(steps, "process_vectorized", rows, lab2.process_vectorized, path, os.path.join(work_dir, "out.txt"))
+    return steps
+
+def bench_lab3(rows, seed, work_dir):
+    from gradebook import assign_grades, assign_scholarship, clean_grades
+    frame = generate_grade_book(rows, seed=seed)
+    steps = {}
+    frame, grade_cols = timed(steps, "clean_grades", rows, clean_grades, frame)
+    frame = timed(steps, "assign_grades", len(frame), assign_grades, frame, grade_cols)
+    frame["Average grade"] = timed(steps, "average", len(frame), lambda: frame[grade_cols].mean(axis=1))
+    timed(steps, "assign_scholarship", len(frame), assign_scholarship, frame)
+    return steps
+
+def bench_lab4(rows, seed, work_dir, queries=2000, reports=20):
+    from gradebook import GradeBook, build_group_summary, build_indexes, prepare_analysis
+    from gradebook.reports import render_report
+    from gradebook.storage import normalize_columns
+    frame, numeric_cols = prepare_analysis(normalize_columns(generate_grade_book(rows, seed=seed)))
+    steps = {}
+    timed(steps, "build_indexes", len(frame), build_indexes, frame)
+    timed(steps, "build_group_summary", len(frame), build_group_summary, frame, numeric_cols)
+    book = GradeBook(frame, numeric_cols)
+
+    pick = random.Random(seed)
+    names = frame["Name"].tolist()
+    queries = min(queries, len(names))
+    substrings = []
+    for name in pick.sample(names, queries):
+        start = pick.randrange(3)
+        substrings.append(name[start:start + 5])
+    exact = pick.sample(names, queries)
+    timed(steps, "find_students", queries, lambda: [book.find(query) for query in substrings])
+    timed(steps, "find_student_exact", queries, lambda: [book.find_exact(name) for name in exact])
+
+    groups = list(book.summary)[:reports]
+    out_dir = os.path.join(work_dir, "reports")
+    os.makedirs(out_dir)
+    timed(steps, "render_report", len(groups), lambda: [
+        render_report(os.path.join(out_dir, f"Report_{group}.pdf"), group, book.summary[group])
+        for group in groups
+    ])
+    timed(steps, "render_group_chart", len(groups), lambda: [book.group_chart(group) for group in groups])
+    return steps
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class StubModel:
+    """Answers at once, so only the local work of the analyzer is measured"""
+
+    def generate_content(self, prompt, stream=False):
+        response = StubResponse(f"Stub analysis of {len(prompt)} characters.")
+        return [response] if stream else response
+
+def bench_lab6(rows, seed, work_dir):
+    import code_analyzer
+    cache = code_analyzer.AnalysisCache(os.path.join(work_dir, "analyses.sqlite"))
+    model = StubModel()
+    pick = random.Random(seed)
+    snippets = [f"def handler_{i}(cursor, name):\n    query = \"SELECT * FROM t{pick.randrange(100)} WHERE name = '\" + name + \"'\"\n"
+                f"    cursor.execute(query)\n    return cursor.fetchall()\n" for i in range(rows)]
+    steps = {}
+    timed(steps, "analyze_code (miss)", rows, lambda: [code_analyzer.analyze_code(code, model, cache) for code in snippets])
+    timed(steps, "analyze_code (hit)", rows, lambda: [code_analyzer.analyze_code(code, model, cache) for code in snippets])
+    source = "\n\n".join(snippets[:500])
+    source_lines = len(source.splitlines())
+    timed(steps, "check_source (lines)", source_lines, code_analyzer.check_source, source)
+    timed(steps, "analyze_source (lines)", source_lines, code_analyzer.analyze_source, source, model, cache)
+    cache.close()
+    return steps
+
+CASES = {"lab2": bench_lab2, "lab3": bench_lab3, "lab4": bench_lab4, "lab6": bench_lab6}
+
+def run_case(name, rows, seed):
+    """Runs one case in this process and returns its result record"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        start = time.perf_counter()
+        steps = CASES[name](rows, seed, work_dir)
+        return {"rows": rows, "seconds": round(time.perf_counter() - start, 3), "peak_rss_mb": peak_rss_mb(),
+                "steps": steps}
+
+def run_case_process(name, rows, seed):
+    """Runs one case in a child process (for its own peak RSS) and returns its record"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name,
+                                "--rows", str(rows), "--seed", str(seed)],
+                               cwd=here, capture_output=True, text=True, encoding="utf-8")
+    if completed.returncode != 0:
+        return {"rows": rows, "error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the lab scripts on synthetic data")
+    parser.add_argument("cases", nargs="*", help=f"cases to run: {', '.join(CASES)} (all by default)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the default row counts")
+    parser.add_argument("--rows", type=int, help="row count for every case (or for --generate-*)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="JSON result file (default: benchmark_results/<date>.json)")
+    parser.add_argument("--generate-lw2", metavar="PATH", help="only write a synthetic LW2 TSV")
+    parser.add_argument("--generate-lw3", metavar="PATH", help="only write a synthetic LW3 grade book")
+    parser.add_argument("--child", choices=list(CASES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    if args.child:
+        print(json.dumps(run_case(args.child, args.rows, args.seed), ensure_ascii=False))
+        sys.exit()
+    if args.generate_lw2 or args.generate_lw3:
+        if args.generate_lw2:
+            print(f"Written: {generate_lw2(args.generate_lw2, args.rows or DEFAULT_ROWS['lab2'], args.seed)}")
+        if args.generate_lw3:
+            print(f"Written: {write_grade_book(args.generate_lw3, args.rows or DEFAULT_ROWS['lab3'], args.seed)}")
+        sys.exit()
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "cases": {}
+    }
+    for name in args.cases or list(CASES):
+        rows = args.rows or max(int(DEFAULT_ROWS[name] * args.scale), 10)
+        record = run_case_process(name, rows, args.seed)
+        results["cases"][name] = record
+        if "error" in record:
+            print(f"{name}: failed {record['error']}")
+            continue
+        print(f"{name}: {rows} rows, {record['seconds']} s, peak RSS {record['peak_rss_mb']} MB")
+        for step, timing in record["steps"].items():
+            print(f"  {step}: {timing['seconds']} s, {timing['rows_per_s']} rows/s")
+
+    out = args.out or os.path.join("benchmark_results", datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print(f"Results saved to {out}")
@@ -0,0 +1,493 @@
+"""
+Code vulnerability analysis with Gemini, used by lab6.
+
+The model client is created once and reused. Results are kept in an SQLite
+cache keyed by the hash of the normalized code, the model name and the prompt
+version, so unchanged code is never sent to the API twice.
+
+Large Python sources are split into function and class units that are
+analyzed and cached one by one, so an edit only re-sends the changed units.
+Local checks (static_checks) run first: units without risky patterns are not
+sent to the model at all.
+
+Whole folders can be scanned from the command line:
+    python code_analyzer.py scan <folder> --out report.jsonl
+and checked offline with the local rules only:
+    python code_analyzer.py check <file>...
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from static_checks import check_source, format_findings
+
+MODEL_NAME = "gemini-1.5-flash"
+PROMPT_VERSION = 1
+PROMPT = "Analyze the following code for potential security vulnerabilities. List the risks and suggest fixes:\n{code}"
+CACHE_FILE = os.path.join(".cache", "analyses.sqlite")
+NO_FINDINGS = "No vulnerabilities detected."  # stands in for an empty model answer
+LOCAL_CLEAN = "No vulnerabilities detected (no risky patterns found by the local checks)."
+
+_model = None
+
+def get_model():
+    """Returns the shared Gemini model client (genai.configure must be called before)"""
+    global _model
+    if _model is None:
+        import google.generativeai as genai
+        _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+def configure_api(config_path="config.json"):
+    """Configures the Gemini SDK with GOOGLE_API_KEY from config.json"""
+    import google.generativeai as genai
+    with open(config_path, "r") as file:
+        api_key = json.load(file).get("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("API key not found in config.json")
+    genai.configure(api_key=api_key)
+
+class HttpModel:
+    """Model client for an HTTP endpoint: POST {"prompt": ...}, answer {"text": ...}.
+
+    Lets scans run against a local fake model server.
+    """
+
+    def __init__(self, url, timeout=60):
+        self.url = url
+        self.timeout = timeout
+
+    def generate_content(self, prompt, stream=False):
+        request = urllib.request.Request(
+            self.url, data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            result = HttpResponse(json.load(response).get("text", ""))
+        return [result] if stream else result  # the endpoint answers in one chunk
+
+class HttpResponse:
+    def __init__(self, text):
+        self.text = text
+
+class RateLimiter:
+    """Token bucket shared by worker threads: at most rate calls per second on average"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def normalize_code(code):
+    """Drops differences that do not change the code: line endings, trailing spaces, blank edges"""
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+def cache_key(code, model_name=MODEL_NAME, prompt_version=PROMPT_VERSION):
+    """Hash identifying an analysis of this code with this model and prompt"""
+    digest = hashlib.sha256()
+    digest.update(f"{model_name}\0{prompt_version}\0".encode("utf-8"))
+    digest.update(normalize_code(code).encode("utf-8"))
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """SQLite store of analysis results with expiry (ttl, seconds) and LRU eviction above max_entries"""
+
+    def __init__(self, path=CACHE_FILE, ttl=30 * 24 * 3600, max_entries=10000):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")  # cheap commits for the LRU timestamp updates
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS analyses_used ON analyses (used)")
+        self.conn.commit()
+
+    def get(self, key):
+        """Cached result or None if missing or expired"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT result, created FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE analyses SET used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key, result):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, result, created, used) VALUES (?, ?, ?, ?)",
+                (key, result, now, now)
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM analyses WHERE key IN (SELECT key FROM analyses ORDER BY used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+_cache = None
+
+def get_cache():
+    """Returns the shared on-disk cache"""
+    global _cache
+    if _cache is None:
+        _cache = AnalysisCache()
+    return _cache
+
+def request_analysis(code, model=None, cache=None, limiter=None, retries=0, backoff=1.0):
+    """Like analyze_code, but returns (result, was_cached) and raises the last error once all retries failed.
+
+    Retries wait backoff * 2**attempt seconds plus jitter; limiter throttles the remote calls.
+    """
+    cache = get_cache() if cache is None else cache
+    key = cache_key(code)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached, True
+    model = model or get_model()
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = model.generate_content(PROMPT.format(code=code))
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+    result = response.text if response.text else NO_FINDINGS
+    cache.put(key, result)  # errors are not cached
+    return result, False
+
+def analyze_code(code, model=None, cache=None):
+    """Analyzes code for vulnerabilities, answering from the cache when possible.
+
+    model and cache default to the shared Gemini client and on-disk cache; any object
+    with generate_content(prompt) returning something with .text can stand in for the model.
+    """
+    try:
+        return request_analysis(code, model, cache)[0]
+    except Exception as e:
+        return f"Error analyzing code: {e}"
+
+# Chunking: sources longer than CHUNK_LINES are analyzed per function/class unit
+CHUNK_LINES = 80
+MAX_UNIT_LINES = 200  # classes longer than this are split into their methods
+
+def _node_start(node):
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+
+def _split_body(body, lines, prefix=""):
+    units = []
+    pending = []  # consecutive statements that are not functions or classes
+
+    def flush_pending():
+        if pending:
+            start, end = _node_start(pending[0]), pending[-1].end_lineno
+            units.append({"kind": "code", "name": prefix or "module", "start": start, "end": end})
+            pending.clear()
+
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            flush_pending()
+            start, end = _node_start(node), node.end_lineno
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            name = prefix + node.name
+            if kind == "class" and end - start + 1 > MAX_UNIT_LINES:
+                units.extend(_split_body(node.body, lines, name + "."))
+            else:
+                units.append({"kind": kind, "name": name, "start": start, "end": end})
+        else:
+            pending.append(node)
+    flush_pending()
+    return units
+
+def split_units(source):
+    """Splits Python source into function, class and top-level code units with 1-based line ranges.
+
+    Raises SyntaxError if the source cannot be parsed.
+    """
+    lines = source.splitlines()
+    units = _split_body(ast.parse(source).body, lines)
+    for unit in units:
+        unit["code"] = "\n".join(lines[unit["start"] - 1:unit["end"]])
+    return units
+
+LINE_REFERENCE = re.compile(r"\b([Ll]ines?\s+)(\d+)(?:(\s*(?:-|–|to)\s*)(\d+))?")
+
+def map_lines(text, start):
+    """Shifts "line N" / "lines N-M" references in a unit result to file line numbers"""
+    offset = start - 1
+
+    def shift(match):
+        mapped = f"{match.group(1)}{int(match.group(2)) + offset}"
+        if match.group(4):
+            mapped += f"{match.group(3)}{int(match.group(4)) + offset}"
+        return mapped
+    return LINE_REFERENCE.sub(shift, text) if offset else text
+
+def source_units(source):
+    """Units to analyze: split_units for long Python sources, else the whole source as one unit"""
+    line_count = len(source.splitlines())
+    if line_count > CHUNK_LINES:
+        try:
+            units = split_units(source)
+            if units:
+                return units
+        except SyntaxError:
+            pass
+    return [{"kind": "file", "name": "", "start": 1, "end": line_count, "code": source}]
+
+def mark_findings(units, findings):
+    """Gives each unit the "findings" of the local checks that fall into its lines"""
+    for unit in units:
+        unit["findings"] = [finding for finding in findings if unit["start"] <= finding["line"] <= unit["end"]]
+    return units
+
+def analyze_units(source, model=None, cache=None, limiter=None, retries=0, prefilter=True):
+    """Analyzes a source unit by unit; each unit dict gets "result", "cached", "error" and "skipped" keys.
+
+    Short or unparsable sources are analyzed as one unit. Units are cached by their own
+    text, so moving a unit does not invalidate it and only edited units are sent again.
+    With prefilter, units where the local checks find nothing are skipped (LOCAL_CLEAN).
+    """
+    cache = get_cache() if cache is None else cache
+    units = source_units(source)
+    if prefilter:
+        mark_findings(units, check_source(source))
+    for unit in units:
+        unit["skipped"] = prefilter and not unit["findings"]
+        if unit["skipped"]:
+            unit.update(result=LOCAL_CLEAN, cached=False, error=False)
+            continue
+        try:
+            unit["result"], unit["cached"] = request_analysis(unit["code"], model, cache, limiter, retries)
+            unit["error"] = False
+        except Exception as e:
+            unit.update(result=f"Error analyzing code: {e}", cached=False, error=True)
+    return units
+
+def clean_summary(units):
+    """One line listing the line ranges of units with nothing to report"""
+    ranges = ", ".join(f"{unit['start']}-{unit['end']}" for unit in units)
+    return f"No vulnerabilities detected in lines {ranges}."
+
+def merge_results(units):
+    """Joins unit results into one report with file line numbers.
+
+    Units skipped by the local checks or found clean by the model share one summary line at the end.
+    """
+    if len(units) == 1:
+        return units[0]["result"]
+    parts, clean = [], []
+    for unit in units:
+        if unit.get("skipped") or unit["result"] in (NO_FINDINGS, LOCAL_CLEAN):
+            clean.append(unit)
+            continue
+        parts.append(f"Lines {unit['start']}-{unit['end']} ({unit['kind']} {unit['name']}):\n"
+                     f"{map_lines(unit['result'], unit['start'])}")
+    if clean:
+        parts.append(clean_summary(clean))
+    return "\n\n".join(parts)
+
+def analyze_source(source, model=None, cache=None, prefilter=True):
+    """analyze_code for whole files: chunked by units for large Python sources"""
+    return merge_results(analyze_units(source, model, cache, prefilter=prefilter))
+
+# Streaming: results are yielded chunk by chunk as the model produces them
+def stream_analysis(code, model=None, cache=None, cancel=None):
+    """Yields the analysis of code in text chunks; a cached result comes as one chunk.
+
+    The model is called with generate_content(prompt, stream=True), which must return an
+    iterable of objects with .text. The full text is cached once the stream ends; streams
+    stopped early by the cancel event (threading.Event) are not cached.
+    """
+    cache = get_cache() if cache is None else cache
+    key = cache_key(code)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+    model = model or get_model()
+    parts = []
+    for chunk in model.generate_content(PROMPT.format(code=code), stream=True):
+        if cancel is not None and cancel.is_set():
+            return
+        if chunk.text:
+            parts.append(chunk.text)
+            yield chunk.text
+    if not parts:
+        parts.append(NO_FINDINGS)
+        yield parts[0]
+    cache.put(key, "".join(parts))
+
+def stream_source(source, model=None, cache=None, cancel=None, prefilter=True):
+    """stream_analysis for whole files, split into units like analyze_source.
+
+    Unit results are streamed line by line, so line references can be mapped to the file.
+    Units skipped by the local checks are listed on one line at the end, as in merge_results.
+    """
+    units = source_units(source)
+    if prefilter:
+        mark_findings(units, check_source(source))
+    if len(units) == 1:
+        if prefilter and not units[0]["findings"]:
+            yield LOCAL_CLEAN
+        else:
+            yield from stream_analysis(source, model, cache, cancel)
+        return
+    skipped = [unit for unit in units if prefilter and not unit["findings"]]
+    separator = ""
+    for unit in units:
+        if cancel is not None and cancel.is_set():
+            return
+        if prefilter and not unit["findings"]:
+            continue
+        yield f"{separator}Lines {unit['start']}-{unit['end']} ({unit['kind']} {unit['name']}):\n"
+        separator = "\n\n"
+        pending = ""
+        for chunk in stream_analysis(unit["code"], model, cache, cancel):
+            pending += chunk
+            complete, newline, pending = pending.rpartition("\n")
+            if newline:
+                yield map_lines(complete + newline, unit["start"])
+        if pending:
+            yield map_lines(pending, unit["start"])
+    if skipped and not (cancel is not None and cancel.is_set()):
+        yield separator + clean_summary(skipped)
+
+SKIP_DIRS = {".git", ".cache", "__pycache__", ".venv", "venv", "node_modules"}
+
+def iter_source_files(root, extensions=(".py",)):
+    """Paths of the source files under root, skipping VCS, cache and virtualenv folders"""
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            if name.endswith(extensions):
+                yield os.path.join(folder, name)
+
+def _analyze_file(path, model, cache, limiter, retries, prefilter):
+    start = time.perf_counter()
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            code = file.read()
+        units = analyze_units(code, model, cache, limiter, retries, prefilter) if path.endswith(".py") else None
+        if units is None:
+            findings = check_source(code) if prefilter else None
+            if findings == []:
+                record = {"path": path, "result": LOCAL_CLEAN, "error": False, "skipped": True}
+            else:
+                record = {"path": path, "result": request_analysis(code, model, cache, limiter, retries)[0],
+                          "error": False, "skipped": False}
+        else:
+            record = {"path": path, "result": merge_results(units), "error": any(unit["error"] for unit in units),
+                      "units": len(units), "reused": sum(unit["cached"] for unit in units),
+                      "skipped": sum(unit["skipped"] for unit in units)}
+    except Exception as e:
+        record = {"path": path, "result": f"Error analyzing code: {e}", "error": True}
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+def scan_directory(root, report_path, model=None, cache=None, workers=8, rate=5.0, retries=4, extensions=(".py",),
+                   prefilter=True):
+    """Analyzes all source files under root concurrently and appends one JSON line per file to report_path.
+
+    workers bounds the concurrent API calls and rate the calls per second; lines are written
+    as soon as each file is done. With prefilter, clean files and units are not sent.
+    Returns (analyzed, failed) counts.
+    """
+    model = model or get_model()
+    cache = get_cache() if cache is None else cache
+    limiter = RateLimiter(rate) if rate else None
+    analyzed = failed = 0
+    with open(report_path, "a", encoding="utf-8") as report, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_analyze_file, path, model, cache, limiter, retries, prefilter)
+                   for path in iter_source_files(root, extensions)]
+        for future in as_completed(futures):
+            record = future.result()
+            report.write(json.dumps(record, ensure_ascii=False) + "\n")
+            report.flush()
+            analyzed += 1
+            failed += record["error"]
+            print(f"[{analyzed}/{len(futures)}] {record['path']} ({record['seconds']} s)")
+    return analyzed, failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Code vulnerability analyzer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    scan = subparsers.add_parser("scan", help="analyze every source file of a folder")
+    scan.add_argument("root")
+    scan.add_argument("--out", default="report.jsonl", help="JSON lines report, appended to")
+    scan.add_argument("--workers", type=int, default=8, help="concurrent API calls")
+    scan.add_argument("--rate", type=float, default=5.0, help="API calls per second, 0 for no limit")
+    scan.add_argument("--retries", type=int, default=4)
+    scan.add_argument("--ext", nargs="+", default=[".py"], help="file extensions to scan")
+    scan.add_argument("--endpoint", help="URL of an HTTP model server to use instead of Gemini")
+    scan.add_argument("--config", default="config.json")
+    scan.add_argument("--no-prefilter", action="store_true", help="send every file, even if the local checks find nothing")
+    check = subparsers.add_parser("check", help="run only the local checks, without the model")
+    check.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        flagged = 0
+        for path in args.paths:
+            with open(path, "r", encoding="utf-8") as file:
+                findings = check_source(file.read())
+            flagged += bool(findings)
+            print(f"{path}: {len(findings)} finding(s)")
+            if findings:
+                print(format_findings(findings))
+        sys.exit(1 if flagged else 0)
+    if args.endpoint:
+        scan_model = HttpModel(args.endpoint)
+    else:
+        configure_api(args.config)
+        scan_model = get_model()
+    done, errors = scan_directory(args.root, args.out, scan_model, workers=args.workers, rate=args.rate,
+                                  retries=args.retries, extensions=tuple(args.ext), prefilter=not args.no_prefilter)
+    print(f"{done} files analyzed, {errors} failed, report: {args.out}")
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,244 @@
+"""
+SQLite access for the lab datasets: pooled connections, WAL mode and parameterized queries.
+
+test1.py shows the unsafe pattern this replaces: a new connection per query and
+SQL built by string concatenation (SQL injection, and a new statement to
+prepare for every name). Here connections are reused, every query uses "?"
+parameters, so sqlite3 keeps the prepared statement in its cache, and bulk
+inserts go through executemany in one transaction.
+
+    python db_access.py load                  # cleaned_LW2.txt and Processed_LW3.xlsx into database.db
+    python db_access.py find "Aatrox Blackblade"
+    python db_access.py benchmark --queries 20000
+"""
+
+import argparse
+import csv
+import os
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+DB_FILE = "database.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    height REAL,
+    weight REAL,
+    bmi REAL,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_name ON users(name);
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    group_name TEXT,
+    average REAL,
+    scholarship INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_students_name ON students(name);
+CREATE TABLE IF NOT EXISTS grades (
+    student_id INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    subject TEXT NOT NULL,
+    points REAL
+);
+CREATE INDEX IF NOT EXISTS idx_grades_student ON grades(student_id);
+"""
+
+class ConnectionPool:
+    """Keeps up to size open connections to one database and hands them out to threads.
+
+    Connections are opened on first use in WAL mode, so readers do not block the writer.
+    """
+
+    def __init__(self, path=DB_FILE, size=4, timeout=30.0):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection; waits for a free one when size connections are in use"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                self._opened += can_open
+            conn = self._connect() if can_open else self._idle.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._opened = 0
+
+_pool = None
+
+def get_pool(path=DB_FILE):
+    """Returns the shared pool for path, creating the schema on first use"""
+    global _pool
+    if _pool is None or _pool.path != path:
+        _pool = ConnectionPool(path)
+        init_schema(_pool)
+    return _pool
+
+def init_schema(pool):
+    with pool.connection() as conn:
+        conn.executescript(SCHEMA)
+
+# Bulk loading
+def insert_users(pool, rows, replace=False):
+    """Inserts (name, height, weight, bmi, category) tuples in one transaction"""
+    with pool.connection() as conn, conn:
+        if replace:
+            conn.execute("DELETE FROM users")
+        conn.executemany("INSERT INTO users (name, height, weight, bmi, category) VALUES (?, ?, ?, ?, ?)", rows)
+
+def load_bmi_file(pool, path="cleaned_LW2.txt"):
+    """Loads the lab2 output (tab separated, with header) into users; returns the row count"""
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        reader = csv.reader(file, delimiter="\t")
+        next(reader, None)
+        rows = [(name, float(height), float(weight), float(bmi), category)
+                for name, height, weight, bmi, category in reader]
+    insert_users(pool, rows, replace=True)
+    return len(rows)
+
+def insert_students(pool, frame, replace=False):
+    """Inserts a lab3 grade book: one students row per student and one grades row per subject"""
+    grade_cols = [col for col in frame.columns if col.endswith("(points)")]
+    with pool.connection() as conn, conn:
+        if replace:
+            conn.execute("DELETE FROM grades")
+            conn.execute("DELETE FROM students")
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM students").fetchone()[0] + 1
+        ids = range(start, start + len(frame))
+        averages = frame["Average grade"] if "Average grade" in frame else frame[grade_cols].mean(axis=1)
+        scholarship = frame["Scholarship"] == "*" if "Scholarship" in frame else [False] * len(frame)
+        conn.executemany(
+            "INSERT INTO students (id, name, group_name, average, scholarship) VALUES (?, ?, ?, ?, ?)",
+            zip(ids, frame["Name"], frame["Group"].astype(str), averages.astype(float), map(int, scholarship))
+        )
+        conn.executemany(
+            "INSERT INTO grades (student_id, subject, points) VALUES (?, ?, ?)",
+            ((student_id, col[:-len(" (points)")], None if points != points else float(points))
+             for col in grade_cols for student_id, points in zip(ids, frame[col]))
+        )
+    return len(frame)
+
+def load_grade_book(pool, path="Processed_LW3.xlsx"):
+    """Loads the lab3 output into students and grades; returns the student count"""
+    from gradebook.storage import load_table
+    return insert_students(pool, load_table(path), replace=True)
+
+# Lookups
+def find_user(pool, name):
+    """BMI rows of a user by exact name (uses the users(name) index)"""
+    with pool.connection() as conn:
+        return conn.execute("SELECT name, height, weight, bmi, category FROM users WHERE name = ?", (name,)).fetchall()
+
+def find_student(pool, name):
+    """Students with the given name, each as (name, group, average, scholarship, {subject: points})"""
+    with pool.connection() as conn:
+        students = conn.execute(
+            "SELECT id, name, group_name, average, scholarship FROM students WHERE name = ?", (name,)
+        ).fetchall()
+        result = []
+        for student_id, student_name, group, average, scholarship in students:
+            grades = dict(conn.execute("SELECT subject, points FROM grades WHERE student_id = ?", (student_id,)))
+            result.append((student_name, group, average, bool(scholarship), grades))
+        return result
+
+# Benchmark against the test1.py pattern
+def lookup_concatenated(path, name):
+    """The test1.py pattern: new connection and SQL text per query (quotes doubled so names with ' still run)"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT * FROM users WHERE name = '" + name.replace("'", "''") + "'").fetchall()
+    finally:
+        conn.close()
+
+def benchmark(pool, queries=20000, threads=1, seed=0):
+    """Lookup throughput (queries per second) of the old pattern and of the pooled, parameterized one"""
+    with pool.connection() as conn:
+        names = [row[0] for row in conn.execute("SELECT name FROM users")]
+    if not names:
+        raise ValueError("users is empty, run 'python db_access.py load' first")
+    rng = random.Random(seed)
+    sample = [rng.choice(names) for _ in range(queries)]
+    results = {}
+
+    start = time.perf_counter()
+    for name in sample:
+        lookup_concatenated(pool.path, name)
+    results["concatenated, new connection"] = queries / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for name in sample:
+        find_user(pool, name)
+    results["parameterized, pooled"] = queries / (time.perf_counter() - start)
+
+    if threads > 1:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda name: find_user(pool, name), sample, chunksize=256))
+        results[f"parameterized, pooled, {threads} threads"] = queries / (time.perf_counter() - start)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite access to the lab datasets")
+    parser.add_argument("--db", default=DB_FILE)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    load = subparsers.add_parser("load", help="load lab2 and lab3 outputs into the database")
+    load.add_argument("--bmi", default="cleaned_LW2.txt")
+    load.add_argument("--grades", default="Processed_LW3.xlsx")
+    find = subparsers.add_parser("find", help="look up a name in users and students")
+    find.add_argument("name")
+    bench = subparsers.add_parser("benchmark", help="compare lookup throughput with the test1.py pattern")
+    bench.add_argument("--queries", type=int, default=20000)
+    bench.add_argument("--threads", type=int, default=1, help="also time lookups from this many threads")
+    args = parser.parse_args()
+
+    db = get_pool(args.db)
+    if args.command == "load":
+        if os.path.exists(args.bmi):
+            print(f"users: {load_bmi_file(db, args.bmi)} rows from {args.bmi}")
+        if os.path.exists(args.grades):
+            print(f"students: {load_grade_book(db, args.grades)} rows from {args.grades}")
+    elif args.command == "find":
+        users, students = find_user(db, args.name), find_student(db, args.name)
+        for user in users:
+            print("User:", *user)
+        for student in students:
+            print("Student:", *student)
+        if not users and not students:
+            print("Not found")
+            sys.exit(1)
+    else:
+        for label, qps in benchmark(db, args.queries, args.threads).items():
+            print(f"{label}: {qps:,.0f} lookups/s")
+    db.close()
@@ -0,0 +1,13 @@
+"""
+Grade book processing shared by lab3, lab4 and the command line tool (python -m gradebook).
+
+pandas, matplotlib and reportlab are imported inside the functions that use them,
+so importing the package is cheap.
+"""
+
+from gradebook.book import GradeBook, build_group_summary, build_indexes, grade_bands, summarize_group
+from gradebook.grading import (
+    GRADE_LABELS, MISSING_GRADE, SCHOLARSHIP_SHARE, assign_grades, assign_scholarship, clean_grades,
+    grade_columns, grade_scale, numeric_columns, prepare_analysis, process_grades
+)
+from gradebook.storage import load_table, save_table
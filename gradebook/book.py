@@ -0,0 +1,218 @@
+"""
+In-memory grade book for lookups and group summaries (lab4).
+"""
+
+from bisect import insort
+from collections import OrderedDict, defaultdict
+
+CHART_CACHE_SIZE = 256  # rendered charts kept per grade book, least recently used dropped first
+
+def _name_key(name):
+    import pandas as pd
+
+    return str(name).lower() if pd.notna(name) else ""
+
+def _trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+def reindex_name(index, pos, name):
+    """Moves the row at pos from its current name key to the key of name in the
+    name and trigram indexes, keeping every posting list sorted"""
+    old_key, new_key = index["keys"][pos], _name_key(name)
+    if old_key == new_key:
+        return
+    for table, old, new in ((index["name"], [old_key], [new_key]),
+                            (index["trigram"], _trigrams(old_key), _trigrams(new_key))):
+        for key in old:
+            table[key].remove(pos)
+            if not table[key]:
+                del table[key]
+        for key in new:
+            insort(table.setdefault(key, []), pos)
+    index["keys"][pos] = new_key
+
+def build_indexes(frame):
+    """Builds lookup tables over row positions: group, exact name and name trigrams"""
+    import pandas as pd
+
+    keys = [str(name).lower() if pd.notna(name) else "" for name in frame["Name"]]
+    name_index = defaultdict(list)
+    trigram_index = defaultdict(list)
+    for pos, key in enumerate(keys):
+        name_index[key].append(pos)
+        for trigram in _trigrams(key):
+            trigram_index[trigram].append(pos)
+    return {
+        "keys": keys,
+        "name": dict(name_index),
+        "trigram": dict(trigram_index),
+        "group": frame.groupby("Group", sort=False).indices,
+    }
+
+def grade_bands(average):
+    """Boolean masks of the 3/4/5 points bands for a series of average grades"""
+    return [
+        (average >= 60) & (average <= 74),
+        (average >= 75) & (average <= 89),
+        (average >= 90) & (average <= 100)
+    ]
+
+def build_group_summary(frame, numeric_cols):
+    """Per-group counts, subject means, band histogram and low/high lists in one groupby pass"""
+    import pandas as pd
+
+    average = frame["Average grade"]
+    bands = grade_bands(average)
+    parts = pd.concat([
+        frame[["Group"]],
+        (frame["Scholarship"] == "*").rename("scholarship"),
+        bands[0].rename("band_3"), bands[1].rename("band_4"), bands[2].rename("band_5"),
+        frame[numeric_cols]
+    ], axis=1)
+    aggregations = {"scholarship": "sum", "band_3": "sum", "band_4": "sum", "band_5": "sum"}
+    aggregations.update({col: "mean" for col in numeric_cols})
+    grouped = parts.groupby("Group", sort=False)
+    table = grouped.agg(aggregations)
+    table["count"] = grouped.size()
+    below = frame[average < 65].groupby("Group", sort=False)["Name"].agg(list)
+    above = frame[average > 95].groupby("Group", sort=False)["Name"].agg(list)
+
+    summary = {}
+    for group, row in table.iterrows():
+        summary[group] = {
+            "count": int(row["count"]),
+            "scholarship": int(row["scholarship"]),
+            "subjects": {col: row[col] for col in numeric_cols},
+            "bands": [int(row["band_3"]), int(row["band_4"]), int(row["band_5"])],
+            "below_65": below.get(group, []),
+            "above_95": above.get(group, [])
+        }
+    return summary
+
+def summarize_group(rows, numeric_cols):
+    """Summary entry for one group, same layout as in build_group_summary"""
+    average = rows["Average grade"]
+    return {
+        "count": len(rows),
+        "scholarship": int((rows["Scholarship"] == "*").sum()),
+        "subjects": rows[numeric_cols].mean().to_dict(),
+        "bands": [int(band.sum()) for band in grade_bands(average)],
+        "below_65": rows[average < 65]["Name"].tolist(),
+        "above_95": rows[average > 95]["Name"].tolist()
+    }
+
+class GradeBook:
+    """A processed grade book with its lookup indexes and per-group summaries.
+
+    version grows on every change; rendered charts are cached per version, at most
+    CHART_CACHE_SIZE of them.
+    """
+
+    def __init__(self, df, numeric_cols):
+        self.df = df
+        self.numeric_cols = numeric_cols
+        self.index = build_indexes(df)
+        self.summary = build_group_summary(df, numeric_cols)
+        self.version = 0
+        self._charts = OrderedDict()
+
+    @classmethod
+    def load(cls, path):
+        """Reads a workbook (through the columnar cache) and runs the lab4 pipeline on it"""
+        from gradebook.grading import prepare_analysis
+        from gradebook.storage import load_table
+
+        return cls(*prepare_analysis(load_table(path)))
+
+    def find(self, name):
+        """Case-insensitive substring search by name using the trigram index"""
+        query = name.lower()
+        keys = self.index["keys"]
+        if len(query) < 3:
+            positions = [pos for pos, key in enumerate(keys) if query in key]
+        else:
+            postings = [self.index["trigram"].get(query[i:i + 3], []) for i in range(len(query) - 2)]
+            candidates = set(min(postings, key=len))
+            for posting in postings:
+                candidates.intersection_update(posting)
+            positions = sorted(pos for pos in candidates if query in keys[pos])
+        return self.df.iloc[positions]
+
+    def find_exact(self, name):
+        """Returns the first student whose full name matches, falls back to substring search"""
+        positions = self.index["name"].get(name.strip().lower())
+        if positions:
+            return self.df.iloc[positions[:1]]
+        return self.find(name).iloc[:1]
+
+    def group_rows(self, group):
+        """Rows of the group taken by position from the group index"""
+        return self.df.iloc[self.index["group"].get(group, [])]
+
+    def scholars(self):
+        return self.df[self.df["Scholarship"] == "*"]["Name"]
+
+    def refresh_groups(self, groups):
+        """Recomputes the summary only for the given groups"""
+        for group in groups:
+            rows = self.group_rows(group)
+            if rows.empty:
+                self.summary.pop(group, None)
+            else:
+                self.summary[group] = summarize_group(rows, self.numeric_cols)
+
+    def update_student(self, name, **values):
+        """Changes columns of one student and refreshes the affected group summaries.
+
+        A new Name is moved in the name and trigram indexes. The average grade of the
+        student is recomputed; scholarship marks are not,
+        since the top 60% ranking depends on the whole dataset. Returns False if not found.
+        """
+        positions = self.index["name"].get(name.strip().lower())
+        if not positions:
+            return False
+        df = self.df
+        pos = positions[0]
+        groups = {df["Group"].iat[pos]}
+        for col, value in values.items():
+            df.iloc[pos, df.columns.get_loc(col)] = value
+        if "Name" in values:
+            reindex_name(self.index, pos, values["Name"])
+        df.iloc[pos, df.columns.get_loc("Average grade")] = df.iloc[pos][self.numeric_cols].astype(float).mean()
+        if "Group" in values:
+            groups.add(values["Group"])
+            self.index["group"] = df.groupby("Group", sort=False).indices
+        self.refresh_groups(groups)
+        self.version += 1  # charts of older versions are no longer hit and age out of the cache
+        return True
+
+    def _cached_chart(self, key, render):
+        """LRU lookup of a rendered chart; render() is called on a miss"""
+        if key in self._charts:
+            self._charts.move_to_end(key)
+            return self._charts[key]
+        chart = self._charts[key] = render()
+        if len(self._charts) > CHART_CACHE_SIZE:
+            self._charts.popitem(last=False)
+        return chart
+
+    def group_chart(self, group, fmt="png"):
+        """PNG/SVG bytes of the group chart (None if there is nothing to draw), cached per version"""
+        def render():
+            from gradebook.charts import group_chart_bytes
+
+            summary = self.summary.get(group)
+            return group_chart_bytes(group, summary["bands"], fmt) if summary else None
+
+        return self._cached_chart(("group", group, self.version, fmt), render)
+
+    def student_chart(self, name, fmt="png"):
+        """PNG/SVG bytes of the student chart (None if not found), cached per version"""
+        def render():
+            from gradebook.charts import student_chart_bytes
+
+            student = self.find_exact(name)
+            return None if student.empty else student_chart_bytes(
+                name, list(self.numeric_cols), student.iloc[0][self.numeric_cols].astype(float).tolist(), fmt)
+
+        return self._cached_chart(("student", name, self.version, fmt), render)
@@ -0,0 +1,77 @@
+"""
+Headless charts: Agg figures built once and updated in place.
+
+matplotlib is imported when the first chart is drawn.
+"""
+
+import math
+from io import BytesIO
+
+BAND_LABELS = ["3 points", "4 points", "5 points"]
+PIE_START_ANGLE = 140
+_chart_templates = {}
+
+def _pie_template():
+    if "pie" not in _chart_templates:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(6, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        wedges, labels, percents = ax.pie([1, 1, 1], labels=BAND_LABELS, autopct='%1.1f%%', startangle=PIE_START_ANGLE)
+        _chart_templates["pie"] = (fig, ax, wedges, labels, percents)
+    return _chart_templates["pie"]
+
+def _bar_template(subjects):
+    key = ("bar", tuple(subjects))
+    if key not in _chart_templates:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(8, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        bars = ax.bar(subjects, [0] * len(subjects))
+        ax.set_xlabel("Subjects")
+        ax.set_ylabel("Grades")
+        ax.set_title("Student success:")  # reserves room for the title in the layout
+        ax.tick_params(axis="x", labelrotation=45)
+        fig.tight_layout()
+        _chart_templates[key] = (fig, ax, bars)
+    return _chart_templates[key]
+
+def _figure_bytes(fig, fmt):
+    buffer = BytesIO()
+    fig.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+def group_chart_bytes(group, counts, fmt="png"):
+    """Renders the band pie chart of a group by moving the template wedges"""
+    total = sum(counts)
+    if total == 0:
+        return None
+    fig, ax, wedges, labels, percents = _pie_template()
+    theta1 = PIE_START_ANGLE
+    for wedge, label, percent, count in zip(wedges, labels, percents, counts):
+        theta2 = theta1 + 360 * count / total
+        wedge.set_theta1(theta1)
+        wedge.set_theta2(theta2)
+        middle = math.radians((theta1 + theta2) / 2)
+        x, y = math.cos(middle), math.sin(middle)
+        label.set_position((1.1 * x, 1.1 * y))
+        label.set_horizontalalignment("left" if x > 0 else "right")
+        percent.set_position((0.6 * x, 0.6 * y))
+        percent.set_text(f"{100 * count / total:1.1f}%")
+        theta1 = theta2
+    ax.set_title(f'Student success rate of the group {group}')
+    return _figure_bytes(fig, fmt)
+
+def student_chart_bytes(name, subjects, grades, fmt="png"):
+    """Renders the grades bar chart of a student by changing the template bar heights"""
+    fig, ax, bars = _bar_template(subjects)
+    for bar, grade in zip(bars, grades):
+        bar.set_height(grade)
+    ax.set_ylim(0, max(max(grades), 1) * 1.05)
+    ax.set_title(f'Student success: {name}')
+    return _figure_bytes(fig, fmt)
@@ -0,0 +1,157 @@
+"""
+Command line interface: python -m gradebook <command>
+
+    grade [--incremental]    lab3 processing: LW3_english.xlsx -> Processed_LW3.xlsx
+    grade --out-of-core      lab3 processing in chunks, for grade books larger than memory
+    search NAME              students whose name contains NAME
+    report [GROUP ...]       PDF reports (all groups if none given)
+    plot group|student KEY   chart saved as PNG or SVG
+
+search, report and plot read the snapshot of the input workbook, so they do not
+import pandas unless the workbook changed since the last run.
+"""
+
+import argparse
+import os
+import sys
+
+DEFAULT_INPUT = "LW3_english.xlsx"
+DEFAULT_OUTPUT = "Processed_LW3.xlsx"
+
+def print_rows(header, rows):
+    """Prints rows as a table with aligned columns"""
+    widths = [max(len(value) for value in column) for column in zip(header, *rows)]
+    for row in [header] + rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+
+def cmd_grade(args):
+    if args.out_of_core:
+        from gradebook.outofcore import DEFAULT_MEMORY_MB, grade_out_of_core
+
+        try:
+            stats = grade_out_of_core(args.input, args.output, args.memory_mb or DEFAULT_MEMORY_MB)
+        except ValueError as error:
+            print(error)
+            return 1
+        print(f"{stats['students']} students graded, {stats['scholarship']} with scholarship")
+        print(f"{stats['partitions']} partitions, chunks of {stats['chunk_rows']} rows, "
+              f"peak memory {stats['peak_rss_mb'] or 0:.0f} MB of {stats['memory_mb']} MB, {stats['seconds']:.1f} s")
+        print(f"File saved: {args.output}")
+        return 0
+    if args.incremental:
+        from gradebook.incremental import export_processed, update_processed
+
+        stats = update_processed(args.input, args.output)
+        print(f"{stats['rows']} students, {stats['added'] + stats['changed']} regraded, {stats['removed']} removed, "
+              f"{stats['flipped']} scholarship changes, {stats['parts_written']} partitions written")
+        if args.excel:
+            export_processed(args.output, like=args.input)
+        print(f"File saved: {args.output}" if args.excel else f"Results cached for: {args.output}")
+        return 0
+
+    from gradebook.grading import process_grades
+    from gradebook.storage import load_table, save_table
+
+    df = process_grades(load_table(args.input))
+    save_table(df, args.output, excel=args.excel, like=args.input)
+    print(f"{len(df)} students graded, {int((df['Scholarship'] == '*').sum())} with scholarship")
+    print(f"File saved: {args.output}" if args.excel else f"Results cached for: {args.output}")
+    return 0
+
+def cmd_search(args):
+    from gradebook.snapshot import open_snapshot
+
+    snapshot = open_snapshot(args.input)
+    if args.exact:
+        row = snapshot.find_exact(args.name)
+        rows = [row] if row is not None else []
+    else:
+        rows = snapshot.find(args.name)
+    if not rows:
+        print("No student found.")
+        return 1
+    print_rows(snapshot.header, rows)
+    return 0
+
+def cmd_report(args):
+    from gradebook.reports import generate_reports, render_report
+    from gradebook.snapshot import open_snapshot
+
+    snapshot = open_snapshot(args.input)
+    if len(args.groups) == 1 and not args.charts:
+        group = args.groups[0]
+        summary = snapshot.summaries.get(group)
+        if summary is None:
+            print("No group found.")
+            return 1
+        os.makedirs(args.out, exist_ok=True)
+        pdf_path = os.path.join(args.out, f"Report_{group}.pdf")
+        render_report(pdf_path, group, summary)
+        print(f"Report saved as {pdf_path}")
+        return 0
+    results = generate_reports(snapshot.summaries, args.groups or None, args.out, args.workers, args.charts)
+    return 0 if results else 1
+
+def cmd_plot(args):
+    from gradebook.snapshot import open_snapshot
+
+    snapshot = open_snapshot(args.input)
+    if args.kind == "group":
+        from gradebook.charts import group_chart_bytes
+
+        summary = snapshot.summaries.get(args.key)
+        chart = group_chart_bytes(args.key, summary["bands"], args.format) if summary else None
+    else:
+        from gradebook.charts import student_chart_bytes
+
+        row = snapshot.find_exact(args.key)
+        chart = None if row is None else student_chart_bytes(args.key, snapshot.subjects, snapshot.grades(row), args.format)
+    if chart is None:
+        print(f"No {args.kind} found.")
+        return 1
+    out = args.out or f"Chart_{args.key}.{args.format}"
+    with open(out, "wb") as file:
+        file.write(chart)
+    print(f"Chart saved as {out}")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m gradebook", description="Student grade book tools")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="source grade book workbook")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    grade = subparsers.add_parser("grade", help="grade the workbook, rank scholarships and save the result")
+    grade.add_argument("--output", default=DEFAULT_OUTPUT)
+    grade.add_argument("--excel", action="store_true", help="also rewrite the Excel file, not only the cache")
+    grade.add_argument("--incremental", action="store_true",
+                       help="regrade only students changed since the last incremental run")
+    grade.add_argument("--out-of-core", action="store_true",
+                       help="grade in chunks within --memory-mb (output: .csv, .parquet, .feather or .xlsx)")
+    grade.add_argument("--memory-mb", type=int, default=None, help="memory cap of --out-of-core in MB (default 512)")
+    grade.set_defaults(handler=cmd_grade)
+
+    search = subparsers.add_parser("search", help="find students by name")
+    search.add_argument("name")
+    search.add_argument("--exact", action="store_true", help="full name match, first student only")
+    search.set_defaults(handler=cmd_search)
+
+    report = subparsers.add_parser("report", help="PDF reports of groups")
+    report.add_argument("groups", nargs="*", metavar="GROUP", help="groups to report (all if none given)")
+    report.add_argument("--out", default=".", help="folder for the reports")
+    report.add_argument("--workers", type=int, default=None, help="processes for several reports")
+    report.add_argument("--charts", action="store_true", help="embed the group chart")
+    report.set_defaults(handler=cmd_report)
+
+    plot = subparsers.add_parser("plot", help="save a group or student chart")
+    plot.add_argument("kind", choices=["group", "student"])
+    plot.add_argument("key", help="group number or full name")
+    plot.add_argument("--format", choices=["png", "svg"], default="png")
+    plot.add_argument("--out", help="file name (default: Chart_<key>.<format>)")
+    plot.set_defaults(handler=cmd_plot)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+    return args.handler(args)
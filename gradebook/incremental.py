@@ -0,0 +1,223 @@
+"""
+Incremental update of the processed grade book (the lab3 output).
+
+The processed table is cached in hash partitions of Name (storage.write_parts).
+Every row keeps the hash of its cleaned input values (_hash) and a sequence
+number (_seq) that gives the row order. An update cleans the new input, compares
+the hashes by Name and grades only added and changed rows.
+
+The scholarship ranking is a sorted array of (-average, seq) keys, the same order
+as nlargest(keep="first"). Keys of changed rows are removed and inserted with
+searchsorted, the cutoff is the key at position top_count - 1, and only rows
+between the old and the new cutoff change their mark. Only partitions holding
+touched rows are written.
+
+Rows keep the order of their first appearance and new students go to the end,
+which is the order of a full run unless the input moves existing students.
+"""
+
+import os
+import uuid
+
+from gradebook.grading import SCHOLARSHIP_SHARE, assign_grades, clean_grades
+from gradebook.storage import (cache_paths, excel_types, load_table, merge_types, parts_dir, read_meta, read_part,
+                               read_parts, restore_types, source_fingerprint, source_unchanged, write_parts)
+
+PARTITIONS = 32
+STATE_VERSION = 1
+
+def _rank_dtype():
+    import numpy as np
+
+    return np.dtype([("neg", "f8"), ("seq", "i8")])
+
+def rank_keys(average, seq):
+    """Ranking keys, ascending order = best average first, earlier row first on ties"""
+    import numpy as np
+
+    keys = np.empty(len(seq), dtype=_rank_dtype())
+    keys["neg"] = -np.asarray(average, dtype=float)
+    keys["seq"] = seq
+    return keys
+
+def partition_of(names, count=PARTITIONS):
+    """Partition number of each name; the hash does not depend on the process"""
+    import numpy as np
+    import pandas as pd
+
+    return (pd.util.hash_array(np.asarray(names, dtype=object)) % count).astype("int64")
+
+def row_hashes(df, columns):
+    import pandas as pd
+
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+def input_state(path):
+    """Fingerprint of the workbook plus the stamp of its columnar cache.
+
+    Data saved with save_table(excel=False) only changes the cache, and a large
+    grade book may have no workbook at all, so the workbook alone is not enough.
+    """
+    cache_file = cache_paths(path)[0]
+    cache = None
+    if os.path.exists(cache_file):
+        stat = os.stat(cache_file)
+        cache = [stat.st_mtime_ns, stat.st_size]
+    return {"source": source_fingerprint(path), "cache": cache}
+
+def _ranking_file(output_path, generation):
+    return os.path.join(parts_dir(output_path), f"ranking-{generation}.npy")
+
+def _save_ranking(output_path, keys):
+    import numpy as np
+
+    generation = uuid.uuid4().hex[:12]
+    os.makedirs(parts_dir(output_path), exist_ok=True)
+    np.save(_ranking_file(output_path, generation), keys)
+    return generation
+
+def _drop_ranking(output_path, generation):
+    try:
+        os.remove(_ranking_file(output_path, generation))
+    except FileNotFoundError:
+        pass
+
+def _grade_rows(rows, grade_cols):
+    rows = assign_grades(rows, grade_cols)
+    rows["Average grade"] = rows[grade_cols].mean(axis=1)
+    return rows
+
+def _commit(output_path, parts, partitions, keys, state, old_generation=None):
+    """Writes partitions, the ranking and the state; the metadata is written last"""
+    state["ranking"] = _save_ranking(output_path, keys)
+    write_parts(parts, output_path, partitions, meta={"incremental": state})
+    if old_generation:
+        _drop_ranking(output_path, old_generation)
+
+def rebuild(df, grade_cols, output_path, partitions=PARTITIONS, share=SCHOLARSHIP_SHARE, input_source=None):
+    """Full run on a cleaned frame: grades everything and writes all partitions"""
+    import numpy as np
+
+    rows = _grade_rows(df.reset_index(drop=True), grade_cols)
+    seq = np.arange(len(rows))
+    keys = np.sort(rank_keys(rows["Average grade"], seq), order=["neg", "seq"])
+    top = int(len(rows) * share)
+    scholars = np.zeros(len(rows), dtype=bool)
+    scholars[keys["seq"][:top]] = True
+    rows["Scholarship"] = np.where(scholars, "*", "")
+    rows["_seq"] = seq
+    rows["_hash"] = row_hashes(df, list(df.columns))
+    part = partition_of(rows["Name"], partitions)
+    old = (read_meta(cache_paths(output_path)[1]) or {}).get("incremental") or {}
+    state = {"version": STATE_VERSION, "columns": [str(col) for col in df.columns], "grade_cols": list(grade_cols),
+             "share": share, "count": len(rows), "top": top, "next_seq": len(rows), "input": input_source}
+    _commit(output_path, {p: rows[part == p] for p in range(partitions)}, partitions, keys, state, old.get("ranking"))
+    return {"full": True, "rows": len(rows), "added": len(rows), "changed": 0, "removed": 0, "flipped": 0,
+            "parts_written": partitions}
+
+def update_processed(input_path, output_path, partitions=PARTITIONS, share=SCHOLARSHIP_SHARE):
+    """Brings the partitioned output of input_path up to date; returns counts of what was done.
+
+    Falls back to a full rebuild when there is no usable state (first run, other columns,
+    partition count or share, or the output was saved by a full run since).
+    """
+    import numpy as np
+    import pandas as pd
+
+    input_source = input_state(input_path)
+    meta_file = cache_paths(output_path)[1]
+    meta = read_meta(meta_file) or {}
+    state = meta.get("incremental")
+    if state and (state.get("version") != STATE_VERSION or meta.get("parts") != partitions
+                  or not source_unchanged(output_path, meta, meta_file)):
+        state = None  # the output was saved by a full run since, or in another layout
+    if state and state.get("input") == input_source and input_source["cache"] is not None:
+        return {"full": False, "rows": state["count"], "added": 0, "changed": 0, "removed": 0, "flipped": 0,
+                "parts_written": 0}
+
+    df, grade_cols = clean_grades(load_table(input_path))
+    df = df.reset_index(drop=True)
+    input_source = input_state(input_path)  # load_table may have just written the cache
+    usable = (state and state["share"] == share
+              and state["columns"] == [str(col) for col in df.columns]
+              and os.path.exists(_ranking_file(output_path, state["ranking"])))
+    if not usable:
+        return rebuild(df, grade_cols, output_path, partitions, share, input_source)
+
+    # Diff by Name against the partitions (only the bookkeeping columns are read)
+    hashes = row_hashes(df, list(df.columns))
+    previous = read_parts(output_path, partitions, columns=["Name", "_hash", "_seq", "Average grade"])
+    current = pd.DataFrame({"Name": df["Name"], "new_hash": hashes, "pos": np.arange(len(df))})
+    merged = current.merge(previous, on="Name", how="outer", indicator=True)
+    added = merged[merged["_merge"] == "left_only"]
+    removed = merged[merged["_merge"] == "right_only"]
+    both = merged[merged["_merge"] == "both"]
+    changed = both[both["new_hash"] != both["_hash"]]
+
+    # Grade only the added and changed rows
+    fresh = pd.concat([changed, added]).sort_values("pos", kind="stable")
+    rows = _grade_rows(df.iloc[fresh["pos"].to_numpy()].copy(), grade_cols)
+    next_seq = state["next_seq"]
+    is_added = fresh["_merge"].eq("left_only").to_numpy()
+    seq = fresh["_seq"].to_numpy(copy=True)
+    seq[is_added] = np.arange(next_seq, next_seq + int(is_added.sum()))
+    rows["_seq"] = seq.astype("int64")
+    rows["_hash"] = fresh["new_hash"].to_numpy()
+
+    # Order statistics: move the keys of touched rows, then read the new cutoff
+    keys = np.load(_ranking_file(output_path, state["ranking"]))
+    old_cut = keys[state["top"] - 1] if state["top"] else None
+    stale = pd.concat([changed, removed])
+    if len(stale):
+        old_keys = np.sort(rank_keys(stale["Average grade"], stale["_seq"].astype("int64")), order=["neg", "seq"])
+        keys = np.delete(keys, np.searchsorted(keys, old_keys))
+    new_keys = np.sort(rank_keys(rows["Average grade"], rows["_seq"]), order=["neg", "seq"])
+    keys = np.insert(keys, np.searchsorted(keys, new_keys), new_keys)
+    top = int(len(keys) * share)
+
+    rank = np.searchsorted(keys, rank_keys(rows["Average grade"], rows["_seq"]))
+    rows["Scholarship"] = np.where(rank < top, "*", "")
+    rows = rows[[col for col in rows.columns if col not in ("_seq", "_hash")] + ["_seq", "_hash"]]
+    # Untouched rows ranked between the old and the new cutoff gain or lose the mark
+    old_top = 0 if old_cut is None else int(np.searchsorted(keys, old_cut, side="right"))
+    touched = set(rows["_seq"].tolist())
+    flipped_seq = [seq for seq in keys["seq"][min(old_top, top):max(old_top, top)].tolist() if seq not in touched]
+    flip_mark = "*" if top > old_top else ""
+    by_seq = previous.set_index("_seq")["Name"]
+    flipped_names = by_seq.loc[flipped_seq] if flipped_seq else by_seq.iloc[:0]
+
+    # Rewrite only the partitions with touched rows
+    gone = set(stale["Name"].tolist())
+    rows_part = partition_of(rows["Name"], partitions)
+    flipped_part = partition_of(flipped_names, partitions)
+    affected = set(rows_part.tolist()) | set(partition_of(stale["Name"], partitions).tolist()) | set(flipped_part.tolist())
+    updated = {}
+    for part in sorted(affected):
+        frame = read_part(output_path, part)
+        frame = frame[~frame["Name"].isin(gone)]
+        flips = frame["Name"].isin(set(flipped_names[flipped_part == part].tolist()))
+        frame.loc[flips, "Scholarship"] = flip_mark
+        new_rows = rows[rows_part == part]
+        if len(new_rows):
+            new_rows = new_rows.astype({col: dtype for col, dtype in frame.dtypes.items() if col in new_rows.columns},
+                                       errors="ignore")
+            frame = pd.concat([frame, new_rows], ignore_index=True)
+        updated[part] = frame.sort_values("_seq", kind="stable")
+
+    old_generation = state["ranking"]
+    state = dict(state, count=len(keys), top=top, next_seq=next_seq + int(is_added.sum()), input=input_source)
+    _commit(output_path, updated, partitions, keys, state, old_generation)
+    return {"full": False, "rows": len(keys), "added": len(added), "changed": len(changed), "removed": len(removed),
+            "flipped": len(flipped_seq), "parts_written": len(updated)}
+
+def export_processed(output_path, df=None, partitions=PARTITIONS, like=None):
+    """Writes the partitioned output to the Excel file itself, keeping the partitions valid.
+
+    like is the input workbook, whose numeric cells kept as text are exported as numbers.
+    """
+    meta = read_meta(cache_paths(output_path)[1]) or {}
+    types = merge_types(meta.get("excel_types"), excel_types(like) if like else None)
+    if df is None:
+        df = read_parts(output_path, partitions)
+    restore_types(df, types).to_excel(output_path, index=False)
+    write_parts({}, output_path, partitions, meta={"incremental": meta.get("incremental"), "excel_types": types})
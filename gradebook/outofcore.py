@@ -0,0 +1,450 @@
+"""
+Out-of-core lab3 grading for grade books larger than memory.
+
+The input is read in chunks and goes through four passes over temporary Arrow files:
+
+    1. partition   chunks are cleaned and split by the hash of Name, so all rows of a
+                   student land in the same partition
+    2. grade       each partition is deduplicated (first row of a name wins, as in
+                   drop_duplicates), graded and averaged on its own
+    3. threshold   the key of the last scholarship place is found by a radix select
+                   over (-average, row number), the order of nlargest(keep="first");
+                   each round reads two columns and counts one 16-bit digit
+    4. output      partitions are merged back in row order, marked and written in chunks
+
+Chunk rows, the number of partitions and the select buffer are derived from the
+memory cap, measured against the first chunk. The result has the rows, values and
+marks of process_grades; columns other than the points are written as text.
+
+Input: .csv, .feather (or a workbook with an up-to-date columnar cache, see
+storage.load_table) and .xlsx through the openpyxl streaming reader.
+Output: .csv, .parquet, .feather and .xlsx (up to the Excel row limit).
+"""
+
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from gradebook.grading import SCHOLARSHIP_SHARE, assign_grades, clean_grades
+from gradebook.incremental import partition_of
+from gradebook.storage import cache_paths, read_meta, source_unchanged
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_MEMORY_MB = 512
+SAMPLE_ROWS = 2000
+MAX_PARTITIONS = 512
+DIGIT_BITS = 16
+# Shares of the memory left after the interpreter and libraries are loaded
+CHUNK_SHARE = 0.15      # one input or output chunk with its pandas copies
+PARTITION_SHARE = 0.25  # one graded partition while it is built
+SELECT_SHARE = 0.1      # candidate keys sorted in memory by the last select round
+SIGN_BIT = 1 << 63
+
+def rss_mb():
+    """Current resident memory in MB (peak memory where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    return peak_rss_mb() or 0.0
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+# Input
+def _input_source(path):
+    """(kind, path) to stream: the columnar cache of a workbook is used while it is valid"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        cache_file, meta_file = cache_paths(path)
+        meta = read_meta(meta_file)
+        if meta is not None and not meta.get("parts") and os.path.exists(cache_file) \
+                and source_unchanged(path, meta, meta_file):
+            return "feather", cache_file
+        return "xlsx", path
+    if ext in (".feather", ".arrow"):
+        return "feather", path
+    if ext in (".csv", ".txt", ".tsv"):
+        return "csv", path
+    raise ValueError(f"Unsupported input format: {path}")
+
+def count_rows(path):
+    """Number of data rows of the input, read without loading it"""
+    kind, source = _input_source(path)
+    if kind == "feather":
+        import pyarrow as pa
+
+        with pa.ipc.open_file(pa.OSFile(source, "rb")) as reader:
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    if kind == "xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(source, read_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    lines = 0
+    with open(source, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0)
+
+def read_chunks(path, chunk_rows):
+    """Yields the input as DataFrames of up to chunk_rows rows"""
+    import pandas as pd
+
+    kind, source = _input_source(path)
+    if kind == "csv":
+        sep = "\t" if source.lower().endswith(".tsv") else ","
+        yield from pd.read_csv(source, sep=sep, chunksize=chunk_rows)
+    elif kind == "feather":
+        import pyarrow as pa
+
+        with pa.ipc.open_file(pa.OSFile(source, "rb")) as reader:
+            pending, count = [], 0
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for start in range(0, batch.num_rows, chunk_rows):
+                    piece = batch.slice(start, chunk_rows)
+                    pending.append(piece)
+                    count += piece.num_rows
+                    if count >= chunk_rows:
+                        yield pa.Table.from_batches(pending).to_pandas()
+                        pending, count = [], 0
+            if pending:
+                yield pa.Table.from_batches(pending).to_pandas()
+    else:
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(source, read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(value) for value in next(rows)]
+            pending = []
+            for row in rows:
+                pending.append(row)
+                if len(pending) == chunk_rows:
+                    yield pd.DataFrame(pending, columns=header)
+                    pending = []
+            if pending:
+                yield pd.DataFrame(pending, columns=header)
+        finally:
+            workbook.close()
+
+def _prepare_chunk(chunk, offset):
+    """Cleans a chunk (duplicates removed later, by partition) and numbers its rows"""
+    import numpy as np
+    import pandas as pd
+
+    chunk = chunk.copy()
+    chunk["_seq"] = np.arange(offset, offset + len(chunk), dtype="int64")
+    chunk, grade_cols = clean_grades(chunk)
+    for col in chunk.columns:
+        if col in grade_cols:
+            chunk[col] = chunk[col].astype("float64")
+        elif col != "_seq" and not isinstance(chunk[col].dtype, pd.StringDtype):
+            chunk[col] = chunk[col].astype("string")  # one type in every chunk, missing values kept
+    return chunk, grade_cols
+
+def _grade_partition(df, grade_cols):
+    df = df.drop_duplicates(subset=["Name"])
+    df = assign_grades(df, grade_cols)
+    df["Average grade"] = df[grade_cols].mean(axis=1)
+    return df
+
+# Memory plan
+def plan(path, memory_mb, sample_rows=SAMPLE_ROWS):
+    """Chunk rows, partitions, select buffer and batch rows for the memory cap, from a sample"""
+    sample = next(read_chunks(path, sample_rows), None)
+    if sample is None or len(sample) == 0:
+        raise ValueError(f"No rows in {path}")
+    prepared, grade_cols = _prepare_chunk(sample, 0)
+    if "Name" not in prepared.columns:
+        raise ValueError(f"Column 'Name' not found in {path}! Check the file headers.")
+    raw_bytes = sample.memory_usage(deep=True).sum() / len(sample)
+    graded = _grade_partition(prepared, grade_cols)
+    graded_bytes = graded.memory_usage(deep=True).sum() / len(graded)
+
+    available = (memory_mb - rss_mb()) * 2**20
+    # One chunk of the heaviest frame has to fit with its copies
+    if available < 4 * sample_rows * max(raw_bytes, graded_bytes):
+        raise ValueError(f"Memory cap of {memory_mb} MB is too small (the process already uses {rss_mb():.0f} MB)")
+    rows = count_rows(path)
+    chunk_rows = max(int(available * CHUNK_SHARE / (3 * max(raw_bytes, graded_bytes))), sample_rows)
+    partitions = max(1, math.ceil(rows * graded_bytes * 3 / (available * PARTITION_SHARE)))
+    if partitions > MAX_PARTITIONS:
+        raise ValueError(f"Memory cap of {memory_mb} MB is too small for {rows} rows "
+                         f"({partitions} partitions needed, at most {MAX_PARTITIONS})")
+    return {"rows": rows, "chunk_rows": chunk_rows, "partitions": partitions,
+            "batch_rows": max(chunk_rows // partitions, 1),
+            "select_rows": max(int(available * SELECT_SHARE / 48), 1 << 16), "grade_cols": grade_cols}
+
+# Pass 1: hash partitioning
+def partition_input(path, work_dir, settings):
+    """Writes the cleaned input rows to one Arrow file per Name hash partition"""
+    import numpy as np
+    import pyarrow as pa
+
+    count = settings["partitions"]
+    files = [os.path.join(work_dir, f"raw-{part:04d}.arrow") for part in range(count)]
+    writers, schema, offset = [], None, 0
+    try:
+        for chunk in read_chunks(path, settings["chunk_rows"]):
+            size = len(chunk)
+            chunk, _ = _prepare_chunk(chunk, offset)
+            offset += size
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if schema is None:
+                schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                    for field in table.schema]).remove_metadata()
+                table = table.cast(schema)
+                writers = [pa.ipc.new_file(file, schema) for file in files]
+            part = partition_of(chunk["Name"], count)
+            order = np.argsort(part, kind="stable")  # keeps row order inside each partition
+            table = table.take(order)
+            bounds = np.searchsorted(part[order], np.arange(count + 1))
+            for index, writer in enumerate(writers):
+                if bounds[index + 1] > bounds[index]:
+                    writer.write_table(table.slice(bounds[index], bounds[index + 1] - bounds[index]))
+    finally:
+        for writer in writers:
+            writer.close()
+    return files if writers else []
+
+# Pass 2: deduplication and grading per partition
+def grade_partitions(files, work_dir, settings):
+    """Grades every partition; returns the graded files and the number of students"""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    graded_files, students = [], 0
+    for index, file in enumerate(files):
+        df = _grade_partition(feather.read_table(file, memory_map=False).to_pandas(), settings["grade_cols"])
+        os.remove(file)
+        students += len(df)
+        graded_file = os.path.join(work_dir, f"graded-{index:04d}.arrow")
+        table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+        with pa.ipc.new_file(graded_file, table.schema) as writer:
+            writer.write_table(table, max_chunksize=settings["batch_rows"])
+        graded_files.append(graded_file)
+    return graded_files, students
+
+# Pass 3: scholarship threshold
+def rank_words(average, seq):
+    """Two uint64 words whose lexicographic order is (-average, seq)"""
+    import numpy as np
+
+    bits = (-np.asarray(average, dtype="float64") + 0.0).view("uint64")  # + 0.0 folds -0.0 into 0.0
+    high = np.where(bits & np.uint64(SIGN_BIT), ~bits, bits | np.uint64(SIGN_BIT))
+    return high, np.asarray(seq).astype("uint64")
+
+def _digit(high, low, depth):
+    """depth-th 16-bit digit of the 128-bit key (high word first)"""
+    import numpy as np
+
+    word = high if depth < 4 else low
+    return ((word >> np.uint64(48 - DIGIT_BITS * (depth % 4))) & np.uint64(0xFFFF)).astype("int64")
+
+def _prefix_mask(high, low, prefix, depth):
+    """Rows whose first depth digits equal the prefix (a pair of words)"""
+    import numpy as np
+
+    mask = np.ones(len(high), dtype=bool)
+    for word, fixed, digits in ((high, prefix[0], min(depth, 4)), (low, prefix[1], max(depth - 4, 0))):
+        if digits:
+            shift = np.uint64(64 - DIGIT_BITS * digits)
+            mask &= (word >> shift) == (np.uint64(fixed) >> shift)
+    return mask
+
+def _partition_keys(files):
+    import pyarrow.feather as feather
+
+    for file in files:
+        table = feather.read_table(file, columns=["Average grade", "_seq"], memory_map=False)
+        yield rank_words(table.column("Average grade").to_numpy(), table.column("_seq").to_numpy())
+
+def select_cutoff(files, rank, select_rows):
+    """Key words of the row at 0-based position rank in (-average, seq) order.
+
+    Every round counts the next digit of the keys that share the digits found so far;
+    once those keys fit into select_rows they are collected and sorted.
+    """
+    import numpy as np
+
+    prefix, depth = [0, 0], 0
+    while True:
+        counts = np.zeros(1 << DIGIT_BITS, dtype="int64")
+        for high, low in _partition_keys(files):
+            mask = _prefix_mask(high, low, prefix, depth)
+            counts += np.bincount(_digit(high[mask], low[mask], depth), minlength=1 << DIGIT_BITS)
+        if counts.sum() <= select_rows:
+            break
+        below = np.cumsum(counts)
+        digit = int(np.searchsorted(below, rank, side="right"))
+        rank -= int(below[digit - 1]) if digit else 0
+        word = 0 if depth < 4 else 1
+        prefix[word] |= digit << (48 - DIGIT_BITS * (depth % 4))
+        depth += 1
+    highs, lows = [], []
+    for high, low in _partition_keys(files):
+        mask = _prefix_mask(high, low, prefix, depth)
+        highs.append(high[mask])
+        lows.append(low[mask])
+    high, low = np.concatenate(highs), np.concatenate(lows)
+    order = np.lexsort((low, high))
+    return int(high[order[rank]]), int(low[order[rank]])
+
+# Pass 4: ordered output
+class _PartitionCursor:
+    """Reads a graded partition batch by batch, in row order"""
+
+    def __init__(self, file):
+        import pyarrow as pa
+
+        self.reader = pa.ipc.open_file(pa.OSFile(file, "rb"))
+        self.next_batch = 0
+        self.buffer = None
+
+    @property
+    def finished(self):
+        return (self.buffer is None or len(self.buffer) == 0) and self.next_batch >= self.reader.num_record_batches
+
+    def take(self, limit):
+        """Rows with _seq below limit that were not taken yet"""
+        import numpy as np
+
+        pieces = []
+        while True:
+            if self.buffer is None or len(self.buffer) == 0:
+                if self.next_batch >= self.reader.num_record_batches:
+                    break
+                self.buffer = self.reader.get_batch(self.next_batch).to_pandas()
+                self.next_batch += 1
+            cut = int(np.searchsorted(self.buffer["_seq"].to_numpy(), limit))
+            pieces.append(self.buffer.iloc[:cut])
+            self.buffer = self.buffer.iloc[cut:]
+            if len(self.buffer):
+                break
+        return pieces
+
+class ChunkWriter:
+    """Appends DataFrame chunks to a .csv, .parquet, .feather or .xlsx file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.ext = os.path.splitext(path)[1].lower()
+        if self.ext not in (".csv", ".parquet", ".feather", ".arrow", ".xlsx"):
+            raise ValueError(f"Unsupported output format: {path}")
+        self.tmp_path = path + ".tmp"
+        self.writer = None
+        self.schema = None
+
+    def write(self, df):
+        import pyarrow as pa
+
+        if self.ext == ".csv":
+            df.to_csv(self.tmp_path, mode="a" if self.writer else "w", header=self.writer is None, index=False)
+            self.writer = True
+        elif self.ext == ".xlsx":
+            if self.writer is None:
+                from openpyxl import Workbook
+
+                self.writer = Workbook(write_only=True)
+                self.sheet = self.writer.create_sheet()
+                self.sheet.append(list(df.columns))
+            for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+                self.sheet.append(row)
+        else:
+            table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+            if self.writer is None:
+                self.schema = table.schema.remove_metadata()
+                table = table.cast(self.schema)
+                if self.ext == ".parquet":
+                    import pyarrow.parquet as pq
+
+                    self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+                else:
+                    self.writer = pa.ipc.new_file(self.tmp_path, self.schema)
+            self.writer.write_table(table)
+
+    def close(self):
+        """Finishes the file and moves it into place"""
+        if self.ext == ".xlsx" and self.writer is not None:
+            self.writer.save(self.tmp_path)
+        elif self.ext not in (".csv", ".xlsx") and self.writer is not None:
+            self.writer.close()
+        if self.writer is not None:
+            os.replace(self.tmp_path, self.path)
+
+def write_output(files, output_path, cutoff, settings):
+    """Merges the graded partitions in row order, adds the scholarship marks and writes the chunks"""
+    import numpy as np
+    import pandas as pd
+
+    cursors = [_PartitionCursor(file) for file in files]
+    writer = ChunkWriter(output_path)
+    scholars = 0
+    limit = 0
+    while not all(cursor.finished for cursor in cursors):
+        limit += settings["chunk_rows"]
+        pieces = [piece for cursor in cursors for piece in cursor.take(limit) if len(piece)]
+        if not pieces:
+            continue
+        df = pd.concat(pieces, ignore_index=True).sort_values("_seq", kind="stable", ignore_index=True)
+        if cutoff is None:
+            marked = np.zeros(len(df), dtype=bool)
+        else:
+            high, low = rank_words(df["Average grade"].to_numpy(), df["_seq"].to_numpy())
+            marked = (high < np.uint64(cutoff[0])) | ((high == np.uint64(cutoff[0])) & (low <= np.uint64(cutoff[1])))
+        df["Scholarship"] = np.where(marked, "*", "")
+        scholars += int(marked.sum())
+        writer.write(df.drop(columns=["_seq"]))
+    writer.close()
+    return scholars
+
+def grade_out_of_core(input_path, output_path, memory_mb=DEFAULT_MEMORY_MB, share=SCHOLARSHIP_SHARE, work_dir=None):
+    """lab3 grading of a grade book of any size within about memory_mb of memory.
+
+    Temporary partitions go to work_dir (a folder next to the output by default) and
+    are removed at the end. Returns the plan, counts, timings and peak memory.
+    """
+    start = time.perf_counter()
+    settings = plan(input_path, memory_mb)
+    folder = tempfile.mkdtemp(prefix=".grading-", dir=work_dir or os.path.dirname(os.path.abspath(output_path)))
+    timings = {}
+    try:
+        step = time.perf_counter()
+        files = partition_input(input_path, folder, settings)
+        timings["partition"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        files, students = grade_partitions(files, folder, settings)
+        timings["grade"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        top = int(students * share)
+        cutoff = select_cutoff(files, top - 1, settings["select_rows"]) if top else None
+        timings["threshold"] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        scholars = write_output(files, output_path, cutoff, settings)
+        timings["output"] = time.perf_counter() - step
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    stats = {key: value for key, value in settings.items() if key != "grade_cols"}
+    stats.update(students=students, scholarship=scholars, seconds=round(time.perf_counter() - start, 3),
+                 timings={key: round(value, 3) for key, value in timings.items()},
+                 memory_mb=memory_mb, peak_rss_mb=peak_rss_mb())
+    return stats
@@ -0,0 +1,103 @@
+"""
+PDF group reports. reportlab is imported when the first report is drawn.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+# Report layout shared by all reports
+REPORT_PAGE_SIZE = (612.0, 792.0)  # letter
+REPORT_FONT = ("Helvetica", 12)
+REPORT_LEFT = 100
+REPORT_INDENT = 120
+REPORT_TOP = 750
+REPORT_BOTTOM = 50
+REPORT_LINE = 20
+
+REPORT_CHART_SIZE = 300
+
+def render_report(pdf_path, group, summary, chart=None):
+    """Draws the group report from its summary, starting a new page when the current one is full.
+
+    chart is optional PNG bytes placed after the text.
+    """
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(pdf_path, pagesize=REPORT_PAGE_SIZE)
+    c.setFont(*REPORT_FONT)
+    y = REPORT_TOP
+
+    def line(text="", x=REPORT_LEFT):
+        nonlocal y
+        if y < REPORT_BOTTOM:
+            c.showPage()
+            c.setFont(*REPORT_FONT)
+            y = REPORT_TOP
+        if text:
+            c.drawString(x, y, text)
+        y -= REPORT_LINE
+
+    line(f"Group report {group}")
+    line(f"Number of students: {summary['count']}")
+    line(f"Number of students with scholarships: {summary['scholarship']}")
+    line("Average grades by subject:")
+    for subj, avg in summary["subjects"].items():
+        line(f"{subj}: {avg:.2f}", REPORT_INDENT)
+
+    line()
+    line("Students with scores below 65 points:")
+    for name in summary["below_65"]:
+        line(name, REPORT_INDENT)
+
+    line()
+    line("Students with scores above 95 points:")
+    for name in summary["above_95"]:
+        line(name, REPORT_INDENT)
+
+    if chart is not None:
+        if y - REPORT_CHART_SIZE < REPORT_BOTTOM:
+            c.showPage()
+            y = REPORT_TOP
+        c.drawImage(ImageReader(BytesIO(chart)), REPORT_LEFT, y - REPORT_CHART_SIZE,
+                    width=REPORT_CHART_SIZE, height=REPORT_CHART_SIZE)
+
+    c.save()
+
+def _render_timed(pdf_path, group, summary, with_chart=False):
+    """Worker for generate_reports, returns the time spent on the report"""
+    start = time.perf_counter()
+    chart = None
+    if with_chart:
+        from gradebook.charts import group_chart_bytes
+        chart = group_chart_bytes(group, summary["bands"])
+    render_report(pdf_path, group, summary, chart)
+    return time.perf_counter() - start
+
+def generate_reports(summaries, groups=None, out_dir=".", workers=None, with_charts=False):
+    """Renders reports for the given groups (all by default) in a process pool.
+
+    summaries maps group -> summary as built by build_group_summary.
+    """
+    groups = list(summaries) if groups is None else groups
+    missing = [group for group in groups if group not in summaries]
+    for group in missing:
+        print(f"No group found: {group}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    results = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_render_timed, os.path.join(out_dir, f"Report_{group}.pdf"), group,
+                            summaries[group], with_charts): group
+            for group in groups if group in summaries
+        }
+        for future in as_completed(futures):
+            group = futures[future]
+            results[group] = future.result()
+            print(f"Report_{group}.pdf: {results[group]:.3f} s")
+    print(f"{len(results)} reports saved to {out_dir} in {time.perf_counter() - start:.2f} s")
+    return results
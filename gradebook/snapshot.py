@@ -0,0 +1,100 @@
+"""
+Light snapshot of a processed grade book for the fast CLI commands.
+
+Next to the columnar cache, GradeBook rows are saved as a TSV file and the group
+summaries as JSON. search, report and plot read them with the standard library
+only, without importing pandas, as long as the source workbook is unchanged.
+"""
+
+import csv
+import json
+import os
+
+from gradebook.storage import cache_paths, read_meta, source_fingerprint, source_unchanged, write_meta
+
+SNAPSHOT_VERSION = 1
+
+class Snapshot:
+    """Rows (lists of strings) with their header, and the summaries of all groups"""
+
+    def __init__(self, header, rows, summaries, subjects):
+        self.header = header
+        self.rows = rows
+        self.summaries = summaries
+        self.subjects = subjects
+        self._keys = [row[0].lower() for row in rows]
+
+    def find(self, name):
+        """Case-insensitive substring search by name"""
+        query = name.lower()
+        return [row for row, key in zip(self.rows, self._keys) if query in key]
+
+    def find_exact(self, name):
+        """First row with this full name, falls back to substring search"""
+        query = name.strip().lower()
+        for row, key in zip(self.rows, self._keys):
+            if key == query:
+                return row
+        found = self.find(name)
+        return found[0] if found else None
+
+    def grades(self, row):
+        """Subject grades of a row as floats, in subjects order"""
+        return [float(row[self.header.index(subject)]) for subject in self.subjects]
+
+def snapshot_paths(path):
+    base = os.path.splitext(cache_paths(path)[0])[0]
+    return base + ".rows.tsv", base + ".summary.json", base + ".snapshot.json"
+
+def write_snapshot(book, path):
+    """Saves the rows and summaries of a GradeBook loaded from the workbook at path"""
+    rows_file, summary_file, meta_file = snapshot_paths(path)
+    os.makedirs(os.path.dirname(rows_file), exist_ok=True)
+    subjects = [str(col) for col in book.numeric_cols]
+    columns = ["Name", "Group"] + subjects + ["Average grade", "Scholarship"]
+    frame = book.df[columns]
+    with open(rows_file, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, delimiter="\t")
+        writer.writerow(columns)
+        writer.writerows(frame.itertuples(index=False, name=None))
+    summaries = {
+        str(group): {
+            "count": summary["count"],
+            "scholarship": summary["scholarship"],
+            "subjects": {str(col): float(value) for col, value in summary["subjects"].items()},
+            "bands": summary["bands"],
+            "below_65": [str(name) for name in summary["below_65"]],
+            "above_95": [str(name) for name in summary["above_95"]]
+        }
+        for group, summary in book.summary.items()
+    }
+    with open(summary_file, "w", encoding="utf-8") as file:
+        json.dump(summaries, file, ensure_ascii=False)
+    write_meta(meta_file, {"version": SNAPSHOT_VERSION, "source": source_fingerprint(path), "subjects": subjects})
+
+def load_snapshot(path):
+    """Returns the Snapshot of the workbook at path, None if missing or outdated"""
+    rows_file, summary_file, meta_file = snapshot_paths(path)
+    meta = read_meta(meta_file)
+    if meta is None or meta.get("version") != SNAPSHOT_VERSION or not source_unchanged(path, meta, meta_file):
+        return None
+    try:
+        with open(rows_file, "r", encoding="utf-8", newline="") as file:
+            reader = csv.reader(file, delimiter="\t")
+            header = next(reader)
+            rows = list(reader)
+        with open(summary_file, "r", encoding="utf-8") as file:
+            summaries = json.load(file)
+    except (FileNotFoundError, StopIteration, json.JSONDecodeError):
+        return None
+    return Snapshot(header, rows, summaries, meta["subjects"])
+
+def open_snapshot(path):
+    """load_snapshot, rebuilding the snapshot with the pandas pipeline when it is outdated"""
+    snapshot = load_snapshot(path)
+    if snapshot is None:
+        from gradebook.book import GradeBook
+
+        write_snapshot(GradeBook.load(path), path)
+        snapshot = load_snapshot(path)
+    return snapshot
@@ -0,0 +1,218 @@
+"""
+Columnar cache for the Excel grade books used by lab3, lab4 and lab5.
+
+The first load of a workbook converts it to an uncompressed Feather file in
+the .cache folder next to it. Later loads memory-map that file instead of
+parsing the Excel XML again. The cache is rebuilt when the source file changes
+(checked by mtime and size, then by SHA-256 hash if those differ).
+
+A table can also be cached as hash partitions (write_parts), so an update
+rewrites only the partitions it touches; load_table reads whichever layout
+was written last.
+
+pandas and pyarrow are imported on first use, so the package imports quickly.
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+CACHE_DIR = ".cache"
+
+def cache_paths(path):
+    """Returns (feather file, metadata file) used to cache the given workbook"""
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    base = os.path.join(folder, os.path.basename(path))
+    return base + ".feather", base + ".json"
+
+def file_hash(path):
+    """SHA-256 of the file content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_fingerprint(path):
+    """Describes the current state of the source file, None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {"mtime": stat.st_mtime_ns, "size": stat.st_size, "sha256": file_hash(path)}
+
+def read_meta(meta_file):
+    try:
+        with open(meta_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def write_meta(meta_file, meta):
+    tmp_file = meta_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump(meta, file)
+    os.replace(tmp_file, meta_file)
+
+def source_unchanged(path, meta, meta_file):
+    """Checks the cached fingerprint against the source file"""
+    source = meta.get("source")
+    if not os.path.exists(path):
+        return source is None
+    if source is None:
+        return False
+    stat = os.stat(path)
+    if stat.st_mtime_ns == source["mtime"] and stat.st_size == source["size"]:
+        return True
+    if stat.st_size != source["size"] or file_hash(path) != source["sha256"]:
+        return False
+    # Same content with a new mtime (copied or touched file): remember the new mtime
+    source["mtime"] = stat.st_mtime_ns
+    write_meta(meta_file, meta)
+    return True
+
+EXCEL_TYPES = {"int": int, "float": float, "bool": lambda text: text == "True"}
+
+def normalize_columns(df):
+    """Turns object columns with mixed value types (e.g. int and str groups) into strings.
+
+    Arrow needs one type per column, and all scripts compare these columns with text input.
+    """
+    import pandas as pd
+
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].dropna()
+        if values.map(type).nunique() > 1:
+            df[col] = df[col].map(lambda value: value if pd.isna(value) else str(value))
+    return df
+
+def mixed_values(df):
+    """{column: {text: type name}} for the non-text values that normalize_columns turns into text"""
+    found = {}
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].dropna()
+        if values.map(type).nunique() > 1:
+            typed = {str(value): type(value).__name__ for value in values.unique() if not isinstance(value, str)}
+            found[str(col)] = {text: name for text, name in typed.items() if name in EXCEL_TYPES}
+    return found
+
+def merge_types(*type_maps):
+    merged = {}
+    for types in type_maps:
+        for col, values in (types or {}).items():
+            merged.setdefault(col, {}).update(values)
+    return merged
+
+def excel_types(path):
+    """Cell types of the workbook at path that its cache keeps as text (see mixed_values)"""
+    return (read_meta(cache_paths(path)[1]) or {}).get("excel_types", {})
+
+def restore_types(df, types):
+    """Copy of the frame with the recorded numeric and boolean cells turned back from text"""
+    columns = [col for col in df.columns if str(col) in types]
+    if not columns:
+        return df
+    df = df.copy()
+    for col in columns:
+        values = types[str(col)]
+        df[col] = df[col].astype(object).map(
+            lambda value: EXCEL_TYPES[values[value]](value) if isinstance(value, str) and value in values else value)
+    return df
+
+def write_cache(df, path, types=None):
+    """Stores the frame in the columnar cache of the given workbook path.
+
+    types are cell types to restore on Excel export (see restore_types), in addition
+    to the ones found in df itself.
+    """
+    import pyarrow.feather as feather
+
+    cache_file, meta_file = cache_paths(path)
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    df = df.reset_index(drop=True)
+    types = merge_types(types, mixed_values(df))
+    df = normalize_columns(df)
+    tmp_file = cache_file + ".tmp"
+    feather.write_feather(df, tmp_file, compression="uncompressed")  # uncompressed to allow mmap
+    os.replace(tmp_file, cache_file)
+    write_meta(meta_file, {"source": source_fingerprint(path), "excel_types": types})
+    return df
+
+def parts_dir(path):
+    """Folder of the partitioned cache of the given workbook path"""
+    return os.path.splitext(cache_paths(path)[0])[0] + ".parts"
+
+def part_file(path, part):
+    return os.path.join(parts_dir(path), f"part-{part:04d}.feather")
+
+def write_parts(parts, path, count, meta=None):
+    """Stores frames of some partitions ({part: frame}) in the partitioned cache of path.
+
+    Partitions not in parts are left as they are. count is the total number of partitions,
+    meta extra data to keep in the cache metadata (see read_meta).
+    """
+    import pyarrow.feather as feather
+
+    os.makedirs(parts_dir(path), exist_ok=True)
+    for part, df in parts.items():
+        target = part_file(path, part)
+        feather.write_feather(normalize_columns(df.reset_index(drop=True)), target + ".tmp", compression="uncompressed")
+        os.replace(target + ".tmp", target)
+    write_meta(cache_paths(path)[1], dict(meta or {}, source=source_fingerprint(path), parts=count))
+
+def read_part(path, part, columns=None):
+    import pyarrow.feather as feather
+
+    return feather.read_table(part_file(path, part), columns=columns, memory_map=True).to_pandas()
+
+def read_parts(path, count, columns=None):
+    """Joins all partitions back into one frame, in "_seq" order when that column exists.
+
+    Columns starting with "_" are bookkeeping of the writer and are dropped unless asked for.
+    """
+    import pandas as pd
+
+    df = pd.concat([read_part(path, part, columns) for part in range(count)], ignore_index=True)
+    if "_seq" in df.columns:
+        df = df.sort_values("_seq", kind="stable", ignore_index=True)
+    if columns is None:
+        df = df.drop(columns=[col for col in df.columns if str(col).startswith("_")])
+    return df
+
+def load_table(path):
+    """Loads a workbook, using the columnar cache when it is up to date"""
+    import pandas as pd
+    import pyarrow.feather as feather
+
+    cache_file, meta_file = cache_paths(path)
+    meta = read_meta(meta_file)
+    if meta is not None and meta.get("parts") and source_unchanged(path, meta, meta_file):
+        return read_parts(path, meta["parts"])
+    # Caches written before the cell types were recorded are read again from the workbook, if any
+    if meta is not None and ("excel_types" in meta or not os.path.exists(path)) and os.path.exists(cache_file) \
+            and source_unchanged(path, meta, meta_file):
+        return feather.read_table(cache_file, memory_map=True).to_pandas()
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return write_cache(pd.read_excel(path), path)
+
+def save_table(df, path, excel=False, like=None):
+    """Saves the frame to the cache of path, and to the Excel file itself if excel is True.
+
+    Cells that the cache of like (the workbook the data was loaded from, path itself by
+    default) keeps as text are written to Excel with their original types.
+    """
+    types = merge_types(excel_types(path), excel_types(like) if like else None)
+    if excel:
+        restore_types(df, types).to_excel(path, index=False)
+    # The cache keeps the fingerprint of the current Excel file, so an old workbook
+    # left at path does not override the newer cached data on the next load
+    return write_cache(df, path, types)
+
+if __name__ == "__main__":
+    # Explicit Excel export of cached data: python -m gradebook.storage Processed_LW3.xlsx
+    if len(sys.argv) != 2:
+        print("Usage: python -m gradebook.storage <workbook.xlsx>")
+        sys.exit(1)
+    save_table(load_table(sys.argv[1]), sys.argv[1], excel=True)
+    print(f"File saved: {sys.argv[1]}")
@@ -1,6 +1,16 @@
+import argparse
 import csv
+import io
+import mmap
+import os
 import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from profiling import enable as enable_profiling, profiled, stage
 
+@profiled(rows=len)
 def parse_data(filename):
     """Reads data from file and returns list of dictionaries"""
     data = []
@@ -16,34 +26,52 @@ def parse_data(filename):
                 })
     return data
 
+def clean_person(person):
+    """Cleans a single row, returns None if the numbers are incorrect"""
+    try:
+        height = int(re.sub(r'[^0-9]', '', person['ріст']))
+        weight = int(re.sub(r'[^0-9]', '', person['вага']))
+    except ValueError:
+        return None
+    return {"name": person['ПІБ'].title(), "height": height, "weight": weight}
+
+@profiled(rows=len)
 def clean_data(data):
     """Cleans data: checks numbers, brings names into a uniform format"""
     cleaned_data = []
     for person in data:
-        try:
-            height = int(re.sub(r'[^0-9]', '', person['ріст']))
-            weight = int(re.sub(r'[^0-9]', '', person['вага']))
-            name = person['ПІБ'].title()
-            cleaned_data.append({"name": name, "height": height, "weight": weight})
-        except ValueError:
-            continue  # Skip incorrect lines
+        cleaned = clean_person(person)
+        if cleaned is not None:  # Skip incorrect lines
+            cleaned_data.append(cleaned)
     return cleaned_data
 
+def bmi_category(bmi):
+    """Determines weight category for the BMI value"""
+    if bmi < 18.5:
+        return "Underweight"
+    elif 18.5 <= bmi < 25:
+        return "Normal weight"
+    elif 25 <= bmi < 35:
+        return "Overweight"
+    return "Obese"
+
+def compute_bmi(height, weight):
+    """BMI rounded to 2 digits, height in cm"""
+    height_m = height / 100  # Convert cm to meters
+    return round(weight / (height_m ** 2), 2)
+
+def score_person(person):
+    """Adds BMI and weight category to a single cleaned row"""
+    bmi = compute_bmi(person['height'], person['weight'])
+    person["BMI"] = bmi
+    person["Weight Category"] = bmi_category(bmi)
+    return person
+
+@profiled(rows=len)
 def calculate_bmi(data):
     """Calculates BMI and determines weight category"""
     for person in data:
-        height_m = person['height'] / 100  # Convert cm to meters
-        bmi = round(person['weight'] / (height_m ** 2), 2)
-        if bmi < 18.5:
-            category = "Underweight"
-        elif 18.5 <= bmi < 25:
-            category = "Normal weight"
-        elif 25 <= bmi < 35:
-            category = "Overweight"
-        else:
-            category = "Obese"
-        person["BMI"] = bmi
-        person["Weight Category"] = category
+        score_person(person)
     return data
 
 
@@ -78,25 +106,388 @@ def analyze_data(data):
         "Obese (%)": obese
     }
 
+OUTPUT_HEADER = ["Name", "Height", "Weight", "BMI", "Weight Category"]
+
 def save_cleaned_data(filename, data):
     """Saves the cleaned data to a new file"""
     with open(filename, 'w', encoding='utf-8', newline='') as file:
         writer = csv.writer(file, delimiter='\t')
-        writer.writerow(["Name", "Height", "Weight", "BMI", "Weight Category"])
+        writer.writerow(OUTPUT_HEADER)
         for person in data:
             writer.writerow([person['name'], person['height'], person['weight'], person['BMI'], person['Weight Category']])
 
+# Streaming mode: parse -> clean -> BMI -> write in a single pass
+
+def iter_records(lines):
+    """Yields rows from an iterable of text lines, same format as parse_data"""
+    for row in csv.reader(lines, delimiter='\t'):
+        if len(row) == 3:
+            yield {
+                "ПІБ": row[0].strip(),
+                "ріст": row[1].strip(),
+                "вага": row[2].strip()
+            }
+
+def iter_data(filename):
+    """Yields rows from file one by one, same format as parse_data"""
+    with open(filename, 'r', encoding='utf-8') as file:
+        next(file, None)  # skip the headlines
+        yield from iter_records(file)
+
+def iter_clean(rows):
+    """Lazy version of clean_data"""
+    for person in rows:
+        cleaned = clean_person(person)
+        if cleaned is not None:
+            yield cleaned
+
+def iter_bmi(rows):
+    """Lazy version of calculate_bmi"""
+    for person in rows:
+        yield score_person(person)
+
+CATEGORIES = ["Underweight", "Normal weight", "Overweight", "Obese"]
+
+def new_stats():
+    """Creates empty running accumulators for analyze_data statistics"""
+    return {
+        "count": 0,
+        "height_sum": 0,
+        "weight_sum": 0,
+        "min_height": None,
+        "max_height": None,
+        "min_weight": None,
+        "max_weight": None,
+        "categories": dict.fromkeys(CATEGORIES, 0)
+    }
+
+def update_stats(acc, person):
+    """Adds one scored row to the accumulators"""
+    add_to_stats(acc, person['height'], person['weight'], person['Weight Category'])
+
+def add_to_stats(acc, height, weight, category):
+    """Adds one row given by its values to the accumulators"""
+    if acc["count"] == 0:
+        acc["min_height"] = acc["max_height"] = height
+        acc["min_weight"] = acc["max_weight"] = weight
+    else:
+        if height < acc["min_height"]:
+            acc["min_height"] = height
+        elif height > acc["max_height"]:
+            acc["max_height"] = height
+        if weight < acc["min_weight"]:
+            acc["min_weight"] = weight
+        elif weight > acc["max_weight"]:
+            acc["max_weight"] = weight
+    acc["count"] += 1
+    acc["height_sum"] += height
+    acc["weight_sum"] += weight
+    acc["categories"][category] += 1
+
+def merge_stats(accs):
+    """Combines accumulators of several shards into one"""
+    merged = new_stats()
+    for acc in accs:
+        if acc["count"] == 0:
+            continue
+        if merged["count"] == 0:
+            for key in ("min_height", "max_height", "min_weight", "max_weight"):
+                merged[key] = acc[key]
+        else:
+            merged["min_height"] = min(merged["min_height"], acc["min_height"])
+            merged["max_height"] = max(merged["max_height"], acc["max_height"])
+            merged["min_weight"] = min(merged["min_weight"], acc["min_weight"])
+            merged["max_weight"] = max(merged["max_weight"], acc["max_weight"])
+        merged["count"] += acc["count"]
+        merged["height_sum"] += acc["height_sum"]
+        merged["weight_sum"] += acc["weight_sum"]
+        for category, count in acc["categories"].items():
+            merged["categories"][category] += count
+    return merged
+
+def finalize_stats(acc):
+    """Turns the accumulators into the same dictionary analyze_data returns"""
+    total = acc["count"]
+    categories = acc["categories"]
+    return {
+        "Average Height": acc["height_sum"] / total,
+        "Average Weight": acc["weight_sum"] / total,
+        "Min Height": acc["min_height"],
+        "Max Height": acc["max_height"],
+        "Min Weight": acc["min_weight"],
+        "Max Weight": acc["max_weight"],
+        "Underweight (%)": categories["Underweight"] / total * 100,
+        "Normal Weight (%)": categories["Normal weight"] / total * 100,
+        "Overweight (%)": categories["Overweight"] / total * 100,
+        "Obese (%)": categories["Obese"] / total * 100
+    }
+
+def write_scored(writer, rows, acc):
+    """Writes scored rows and updates the accumulators on the way"""
+    for person in rows:
+        writer.writerow([person['name'], person['height'], person['weight'], person['BMI'], person['Weight Category']])
+        update_stats(acc, person)
+
+def process_streaming(input_file, output_file, reader="csv"):
+    """Runs the whole pipeline row by row, memory use does not depend on file size"""
+    acc = new_stats()
+    with stage(f"stream ({reader})") as current, open(output_file, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file, delimiter='\t')
+        writer.writerow(OUTPUT_HEADER)
+        if reader == "mmap":
+            write_mapped(writer, iter_mapped(input_file), acc)
+        else:
+            write_scored(writer, iter_bmi(iter_clean(iter_data(input_file))), acc)
+        current.rows = acc["count"]
+    return finalize_stats(acc)
+
+# Memory-mapped reader: numbers are parsed straight from the file bytes
+
+NON_DIGITS = bytes(b for b in range(256) if not 0x30 <= b <= 0x39)
+
+def iter_mapped(filename, start=None, end=None):
+    """Yields (name bytes, height, weight) for valid rows of a byte range of the file.
+
+    Without start the headline is skipped. Fields are split on raw tabs, so
+    quoted fields are not unquoted like csv.reader does.
+    """
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            end = len(buffer) if end is None else end
+            if start is None:
+                start = buffer.find(b'\n', 0, end) + 1  # skip the headlines
+                if start == 0:
+                    return
+            pos = start
+            while pos < end:
+                line_end = buffer.find(b'\n', pos, end)
+                if line_end == -1:
+                    line_end = end
+                tab1 = buffer.find(b'\t', pos, line_end)
+                tab2 = buffer.find(b'\t', tab1 + 1, line_end) if tab1 != -1 else -1
+                if tab2 != -1 and buffer.find(b'\t', tab2 + 1, line_end) == -1:
+                    try:
+                        height = int(buffer[tab1 + 1:tab2].translate(None, NON_DIGITS))
+                        weight = int(buffer[tab2 + 1:line_end].translate(None, NON_DIGITS))
+                    except ValueError:
+                        pass  # Skip incorrect lines
+                    else:
+                        yield buffer[pos:tab1], height, weight
+                pos = line_end + 1
+
+def write_mapped(writer, records, acc):
+    """Scores and writes rows from iter_mapped, names are decoded only here"""
+    for name, height, weight in records:
+        bmi = compute_bmi(height, weight)
+        category = bmi_category(bmi)
+        writer.writerow([name.decode('utf-8').strip().title(), height, weight, bmi, category])
+        add_to_stats(acc, height, weight, category)
+
+def process_batch(input_file, output_file):
+    """Original in-memory pipeline"""
+    data = parse_data(input_file)
+    cleaned_data = clean_data(data)
+    processed_data = calculate_bmi(cleaned_data)
+    with stage("analyze_data", len(processed_data)):
+        stats = analyze_data(processed_data)
+    with stage("save_cleaned_data", len(processed_data)):
+        save_cleaned_data(output_file, processed_data)
+    return stats
+
+# Columnar mode: the same pipeline on whole columns at once (needs numpy and pandas)
+
+BMI_BINS = [18.5, 25, 35]
+
+def round_bmi(bmi):
+    """Rounds an array of BMI values to 2 digits exactly like the built-in round"""
+    import numpy as np
+
+    rounded = np.round(bmi, 2)
+    # np.round scales by 100 first, so values sitting on a half may land on the
+    # other side; those few are rounded again with the built-in round
+    scaled = bmi * 100
+    halfway = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if halfway.any():
+        rounded[halfway] = [round(value, 2) for value in bmi[halfway]]
+    return rounded
+
+@profiled(rows=len)
+def load_columns(filename):
+    """Reads the file into a DataFrame with typed name/height/weight columns"""
+    import pandas as pd
+
+    frame = pd.read_csv(filename, sep='\t', header=None, skiprows=1, names=["ПІБ", "ріст", "вага"],
+                        dtype=str, keep_default_na=False, on_bad_lines="skip")
+    frame = frame.dropna()  # rows with less than 3 fields
+    height = frame["ріст"].str.strip().str.replace(r'[^0-9]', '', regex=True)
+    weight = frame["вага"].str.strip().str.replace(r'[^0-9]', '', regex=True)
+    valid = (height != "") & (weight != "")  # Skip incorrect lines
+    return pd.DataFrame({
+        "name": frame["ПІБ"][valid].str.strip().str.title(),
+        "height": height[valid].astype("int64"),
+        "weight": weight[valid].astype("int64")
+    })
+
+@profiled(rows=len)
+def calculate_bmi_columns(frame):
+    """Vectorized calculate_bmi: adds BMI and Weight Category columns"""
+    import numpy as np
+
+    height_m = frame["height"].to_numpy() / 100
+    bmi = round_bmi(frame["weight"].to_numpy() / (height_m ** 2))
+    labels = np.array(CATEGORIES, dtype=object)
+    frame["BMI"] = bmi
+    frame["Weight Category"] = labels[np.digitize(bmi, BMI_BINS)]
+    return frame
+
+def analyze_columns(frame):
+    """Vectorized analyze_data, returns the same dictionary"""
+    total = len(frame)
+    counts = frame["Weight Category"].value_counts()
+    percent = {category: int(counts.get(category, 0)) / total * 100 for category in CATEGORIES}
+    return {
+        "Average Height": int(frame["height"].sum()) / total,
+        "Average Weight": int(frame["weight"].sum()) / total,
+        "Min Height": int(frame["height"].min()),
+        "Max Height": int(frame["height"].max()),
+        "Min Weight": int(frame["weight"].min()),
+        "Max Weight": int(frame["weight"].max()),
+        "Underweight (%)": percent["Underweight"],
+        "Normal Weight (%)": percent["Normal weight"],
+        "Overweight (%)": percent["Overweight"],
+        "Obese (%)": percent["Obese"]
+    }
+
+def process_vectorized(input_file, output_file):
+    """Columnar pipeline, output is identical to process_batch"""
+    frame = calculate_bmi_columns(load_columns(input_file))
+    with stage("analyze_columns", len(frame)):
+        stats = analyze_columns(frame)
+    with stage("write output", len(frame)):
+        frame.to_csv(output_file, sep='\t', index=False, header=OUTPUT_HEADER, encoding='utf-8', lineterminator='\r\n')
+    return stats
+
+# Parallel mode: byte-range shards processed in separate processes
+
+def split_shards(filename, count):
+    """Splits the file (without the headline) into byte ranges that end on a line break"""
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as file:
+        file.readline()  # skip the headlines
+        start = file.tell()
+        step = max((size - start) // count, 1)
+        shards = []
+        while start < size:
+            file.seek(min(start + step, size))
+            if file.tell() < size:
+                file.readline()  # move to the end of the current line
+            end = file.tell()
+            shards.append((start, end))
+            start = end
+    return shards
+
+def process_shard(input_file, start, end, shard_file, reader="csv"):
+    """Cleans and scores one byte range, returns its partial accumulators"""
+    acc = new_stats()
+    with open(shard_file, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file, delimiter='\t')
+        if reader == "mmap":
+            write_mapped(writer, iter_mapped(input_file, start, end), acc)
+        else:
+            with open(input_file, 'rb') as source:
+                source.seek(start)
+                chunk = source.read(end - start)
+            lines = io.StringIO(chunk.decode('utf-8'), newline=None)
+            write_scored(writer, iter_bmi(iter_clean(iter_records(lines))), acc)
+    return acc
+
+def process_parallel(input_file, output_file, workers=None, reader="csv"):
+    """Runs the pipeline on shards in a process pool and merges the results in order.
+
+    Quoted fields with line breaks inside are not supported, shards are cut on any newline.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = split_shards(input_file, workers * 4)  # a few shards per worker to even out the load
+    shard_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        shard_files = [os.path.join(shard_dir, f"shard_{i}.txt") for i in range(len(shards))]
+        with stage(f"process shards ({len(shards)})") as current, ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_shard, input_file, start, end, shard_file, reader)
+                       for (start, end), shard_file in zip(shards, shard_files)]
+            accs = [future.result() for future in futures]
+            current.rows = sum(acc["count"] for acc in accs)
+
+        with stage("merge shards", current.rows):
+            with open(output_file, 'w', encoding='utf-8', newline='') as file:
+                csv.writer(file, delimiter='\t').writerow(OUTPUT_HEADER)
+            with open(output_file, 'ab') as output:
+                for shard_file in shard_files:
+                    with open(shard_file, 'rb') as shard:
+                        shutil.copyfileobj(shard, output)
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+    return finalize_stats(merge_stats(accs))
+
+MODES = {
+    "batch": process_batch,
+    "stream": process_streaming,
+    "vectorized": process_vectorized,
+    "parallel": process_parallel
+}
+
+def benchmark(input_file, output_file, modes=("batch", "vectorized"), repeat=3):
+    """Times each mode on the same input and prints the speedup over batch"""
+    timings = {}
+    for mode in modes:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            MODES[mode](input_file, output_file)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[mode] = best
+    for mode, elapsed in timings.items():
+        speedup = timings[modes[0]] / elapsed if elapsed else float("inf")
+        print(f"{mode}: {elapsed:.3f} s (x{speedup:.2f})")
+    return timings
+
 # Виконання коду
-input_file = "LW2.txt"
-output_file = "cleaned_LW2.txt"
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BMI analysis of the LW2 roster")
+    parser.add_argument("input_file", nargs="?", default="LW2.txt")
+    parser.add_argument("output_file", nargs="?", default="cleaned_LW2.txt")
+    parser.add_argument("--mode", choices=list(MODES), default="batch",
+                        help="stream keeps memory constant for very large files, "
+                             "vectorized processes whole columns with numpy/pandas, "
+                             "parallel splits the file between several processes")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes for the parallel mode (default: all cores)")
+    parser.add_argument("--reader", choices=["csv", "mmap"], default="csv",
+                        help="input reader for the stream and parallel modes; mmap parses "
+                             "numbers from the raw bytes and skips csv quoting rules")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="compare the run time of the batch and vectorized modes")
+    parser.add_argument("--profile", nargs="?", const="timing", metavar="OPTIONS",
+                        help="print per-stage timings at exit (same as LAB_PROFILE=1); "
+                             "OPTIONS may add cprofile and/or tracemalloc, e.g. cprofile,tracemalloc")
+    args = parser.parse_args()
+    if args.profile:
+        enable_profiling({"timing"} | set(args.profile.split(",")))
 
-data = parse_data(input_file)
-cleaned_data = clean_data(data)
-processed_data = calculate_bmi(cleaned_data)
-stats = analyze_data(processed_data)
+    if args.benchmark:
+        benchmark(args.input_file, args.output_file)
+        raise SystemExit
 
-save_cleaned_data(output_file, processed_data)
+    with stage(f"lab2 {args.mode}"):
+        if args.mode == "parallel":
+            stats = process_parallel(args.input_file, args.output_file, args.workers, args.reader)
+        elif args.mode == "stream":
+            stats = process_streaming(args.input_file, args.output_file, args.reader)
+        else:
+            stats = MODES[args.mode](args.input_file, args.output_file)
 
-print("Data analysis statistics:")
-for key, value in stats.items():
-    print(f"{key}: {value}")
+    print("Data analysis statistics:")
+    for key, value in stats.items():
+        print(f"{key}: {value}")
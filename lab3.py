@@ -1,87 +1,96 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import sys
+from gradebook import assign_grades, assign_scholarship, clean_grades, load_table, save_table
+from gradebook.incremental import export_processed, update_processed
+from profiling import enable as enable_profiling, stage
 
 # Force UTF-8 encoding for console output (Windows fix)
 sys.stdout.reconfigure(encoding="utf-8")
 
-def grade_scale(score):
-    """
-    Assigns a grade based on the national grading scale.
-    """
-    if 60 <= score <= 74:
-        return "Good enough"
-    elif 75 <= score <= 89:
-        return "Good"
-    elif 90 <= score <= 100:
-        return "Perfect"
-    return "Error"
-
-# Step 1: Load the data
 FILE_PATH = "LW3_english.xlsx"
-df = pd.read_excel(FILE_PATH)
-
-# Step 2: Ensure correct column names
-df.columns = df.columns.str.strip()  # Removes leading/trailing spaces
-
-# Step 3: Convert only grade columns to numeric, preserving text columns
-grade_cols = [col for col in df.columns if "points" in col.lower() or "grade" in col.lower()]
-for col in grade_cols:
-    df[col] = pd.to_numeric(df[col], errors="coerce")  # Ensures numeric data
-
-# Check for missing values and fill only numeric columns
-df[grade_cols] = df[grade_cols].fillna(60)
-
-# Step 4: Remove duplicates based on 'Name'
-if "Name" not in df.columns:
-    print(" Column 'Name' not found! Check Excel file headers.")
-else:
-    df = df.drop_duplicates(subset=["Name"])
-    print("Duplicates removed successfully!")
+OUTPUT_FILE = "Processed_LW3.xlsx"
+GROUP_NUMBER = "535ст2"
 
-# Step 5: Assign grades based on the national grading scale
-for col in grade_cols:
-    df[f"{col}_grade"] = df[col].apply(grade_scale)
+def process_grades(df):
+    """
+    Steps 2-7: cleaning, national scale grades, average grade and scholarship marks.
+    Same as gradebook.process_grades, with a profiling stage per step.
+    """
+    with stage("clean_grades", len(df)):
+        df, grade_cols = clean_grades(df)
+    if "Name" not in df.columns:
+        print(" Column 'Name' not found! Check Excel file headers.")
+    else:
+        print("Duplicates removed successfully!")
+    with stage("assign_grades", len(df)):
+        df = assign_grades(df, grade_cols)
+    with stage("average grade", len(df)):
+        df["Average grade"] = df[grade_cols].mean(axis=1)
+    # Select top 60% students by average score
+    with stage("assign_scholarship", len(df)):
+        return assign_scholarship(df)
 
-# Step 6: Compute Average Score
-df["Average grade"] = df[grade_cols].mean(axis=1)
+def main():
+    # Per-stage timings: --profile or LAB_PROFILE=1 (see profiling.py)
+    if "--profile" in sys.argv[1:]:
+        enable_profiling()
 
-# Step 7: Scholarship Ranking
-# Select top 60% students by average score
-top_students = df.nlargest(int(len(df) * 0.6), "Average grade")
+    # --incremental: regrade only the students changed since the last incremental run
+    incremental = "--incremental" in sys.argv[1:]
+    if incremental:
+        with stage("update_processed") as current:
+            stats = update_processed(FILE_PATH, OUTPUT_FILE)
+            current.rows = stats["rows"]
+        print(f"Regraded {stats['added'] + stats['changed']} students, removed {stats['removed']}, "
+              f"scholarship changed for {stats['flipped']}, {stats['parts_written']} partitions written")
+        with stage("load_table") as current:
+            df = load_table(OUTPUT_FILE)
+            current.rows = len(df)
+    else:
+        # Step 1: Load the data
+        with stage("load_table") as current:
+            df = load_table(FILE_PATH)  # Excel is parsed once, later runs read the columnar cache
+            current.rows = len(df)
 
-df["Scholarship"] = df["Name"].apply(
-    lambda x: "*" if x in top_students["Name"].values else ""
-)
+        # Steps 2-7: clean, grade, average and scholarship
+        df = process_grades(df)
 
-# Step 8: Identify the top and bottom students
-highest_scorer = df.loc[df["Average grade"].idxmax(), "Name"]
-lowest_scorer = df.loc[df["Average grade"].idxmin(), "Name"]
-num_scholarship = df["Scholarship"].value_counts().get("*", 0)
+    # Step 8: Identify the top and bottom students
+    highest_scorer = df.loc[df["Average grade"].idxmax(), "Name"]
+    lowest_scorer = df.loc[df["Average grade"].idxmin(), "Name"]
+    num_scholarship = df["Scholarship"].value_counts().get("*", 0)
 
-# Step 9: Select students from the specific group
-group_number = "535ст2"
-if "Group" in df.columns:
-    group_students = df[df["Group"] == group_number]
-    if not group_students.empty:
-        highest_in_group = group_students.loc[group_students["Average grade"].idxmax(), "Name"]
-        lowest_in_group = group_students.loc[group_students["Average grade"].idxmin(), "Name"]
-        num_scholarship_group = group_students["Scholarship"].value_counts().get("*", 0)
+    # Step 9: Select students from the specific group
+    group_number = GROUP_NUMBER
+    if "Group" in df.columns:
+        group_students = df[df["Group"] == group_number]
+        if not group_students.empty:
+            highest_in_group = group_students.loc[group_students["Average grade"].idxmax(), "Name"]
+            lowest_in_group = group_students.loc[group_students["Average grade"].idxmin(), "Name"]
+            num_scholarship_group = group_students["Scholarship"].value_counts().get("*", 0)
+        else:
+            highest_in_group, lowest_in_group, num_scholarship_group = "None", "None", 0
     else:
+        print("Column 'Group' not found! Check the data format.")
         highest_in_group, lowest_in_group, num_scholarship_group = "None", "None", 0
-else:
-    print("Column 'Group' not found! Check the data format.")
-    highest_in_group, lowest_in_group, num_scholarship_group = "None", "None", 0
 
-# Display results
-print(f"Max grade overall: {highest_scorer}")
-print(f"Min grade overall: {lowest_scorer}")
-print(f"Students with scholarship overall: {num_scholarship}")
-print(f"Max grade in group {group_number}: {highest_in_group}")
-print(f"Min grade in group {group_number}: {lowest_in_group}")
-print(f"Students with scholarship in group {group_number}: {num_scholarship_group}")
+    # Display results
+    print(f"Max grade overall: {highest_scorer}")
+    print(f"Min grade overall: {lowest_scorer}")
+    print(f"Students with scholarship overall: {num_scholarship}")
+    print(f"Max grade in group {group_number}: {highest_in_group}")
+    print(f"Min grade in group {group_number}: {lowest_in_group}")
+    print(f"Students with scholarship in group {group_number}: {num_scholarship_group}")
 
-# Step 10: Save the results to a new file
-OUTPUT_FILE = "Processed_LW3.xlsx"
-df.to_excel(OUTPUT_FILE, index=False)
-print(f"File saved: {OUTPUT_FILE}")
+    # Step 10: Save the results to a new file
+    # The cache is always written; pass --excel to also rewrite the workbook itself
+    export_excel = "--excel" in sys.argv[1:]
+    with stage("save_table", len(df)):
+        if incremental:
+            if export_excel:
+                export_processed(OUTPUT_FILE, df, like=FILE_PATH)
+        else:
+            save_table(df, OUTPUT_FILE, excel=export_excel, like=FILE_PATH)
+    print(f"File saved: {OUTPUT_FILE}" if export_excel else f"Results cached for: {OUTPUT_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,68 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import argparse
+import os
 import sys
+from gradebook import GradeBook
+from gradebook.reports import generate_reports, render_report
 
 sys.stdout.reconfigure(encoding="utf-8")
 
-def grade_scale(score):
-    if 60 <= score <= 74:
-        return "Good enough"
-    elif 75 <= score <= 89:
-        return "Good"
-    elif 90 <= score <= 100:
-        return "Perfect"
-    return "Error"
-
-# data loading
+# data loading happens in main(), importing this module has no side effects
 FILE_PATH = "LW3_english.xlsx"
-df = pd.read_excel(FILE_PATH)
-df.columns = df.columns.str.strip()
-numeric_cols = df.select_dtypes(include=['number']).columns
-
-df[numeric_cols] = df[numeric_cols].fillna(60)
-df = df.drop_duplicates(subset=["Name"])
-df["Average grade"] = df[numeric_cols].mean(axis=1)
-
-top_students = df.nlargest(int(len(df) * 0.6), "Average grade")
-df["Scholarship"] = df["Name"].apply(lambda x: "*" if x in top_students["Name"].values else "")
+book = None  # GradeBook: processed rows, lookup indexes and group summaries
 
 def search_student(name):
-    student = df[df["Name"].str.contains(name, case=False, na=False)]
+    student = book.find(name)
     if not student.empty:
         print(student.to_string(index=False))
     else:
         print("No student found.")
 
 def search_group(group):
-    group_students = df[df["Group"] == group]
-    if not group_students.empty:
-        print(f"Number of students in the group: {len(group_students)}")
-        print(f"Number of students with scholarship: {group_students['Scholarship'].value_counts().get('*', 0)}")
+    summary = book.summary.get(group)
+    if summary:
+        print(f"Number of students in the group: {summary['count']}")
+        print(f"Number of students with scholarship: {summary['scholarship']}")
     else:
         print("No group found.")
 
 def students_with_scholarship():
-    scholars = df[df["Scholarship"] == "*"]["Name"]
     print("Students with scholarship:")
-    print(scholars.to_string(index=False))
+    print(book.scholars().to_string(index=False))
 
 def plot_group_performance(group):
-    group_students = df[df["Group"] == group]
-    if group_students.empty:
+    summary = book.summary.get(group)
+    if not summary:
         print("No group found.")
         return
-    
+    import matplotlib.pyplot as plt
+
     labels = ["3 points", "4 points", "5 points"]
-    counts = [
-        sum((group_students["Average grade"] >= 60) & (group_students["Average grade"] <= 74)),
-        sum((group_students["Average grade"] >= 75) & (group_students["Average grade"] <= 89)),
-        sum((group_students["Average grade"] >= 90) & (group_students["Average grade"] <= 100))
-    ]
+    counts = summary["bands"]
     
     plt.figure(figsize=(6, 6))
     plt.pie(counts, labels=labels, autopct='%1.1f%%', startangle=140)
     plt.title(f'Student success rate of the group {group}')
     plt.show()
 
+def export_charts(out_dir=".", fmt="png"):
+    """Writes the charts of all groups to files"""
+    os.makedirs(out_dir, exist_ok=True)
+    for group in book.summary:
+        chart = book.group_chart(group, fmt)
+        if chart is not None:
+            with open(os.path.join(out_dir, f"Chart_{group}.{fmt}"), "wb") as file:
+                file.write(chart)
+    print(f"Charts saved to {out_dir}")
+
 def plot_student_performance(name):
-    student = df[df["Name"].str.contains(name, case=False, na=False)]
+    student = book.find_exact(name)
     if student.empty:
         print("No student found.")
         return
-    
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(8, 6))
-    plt.bar(numeric_cols, student.iloc[0][numeric_cols])
+    plt.bar(book.numeric_cols, student.iloc[0][book.numeric_cols])
     plt.xlabel("Subjects")
     plt.ylabel("Grades")
     plt.title(f'Student success: {name}')
@@ -81,40 +70,34 @@ def plot_student_performance(name):
     plt.show()
 
 def generate_report(group):
-    group_students = df[df["Group"] == group]
-    if group_students.empty:
+    summary = book.summary.get(group)
+    if not summary:
         print("No group found.")
         return
     
     pdf_path = f"Report_{group}.pdf"
-    c = canvas.Canvas(pdf_path, pagesize=letter)
-    c.drawString(100, 750, f"Group report {group}")
-    c.drawString(100, 730, f"Number of students: {len(group_students)}")
-    c.drawString(100, 710, f"Number of students with scholarships: {group_students['Scholarship'].value_counts().get('*', 0)}")
-    
-    subjects_avg = group_students[numeric_cols].mean()
-    c.drawString(100, 690, "Average grades by subject:")
-    y = 670
-    for subj, avg in subjects_avg.items():
-        c.drawString(120, y, f"{subj}: {avg:.2f}")
-        y -= 20
-    
-    c.drawString(100, y - 20, "Students with scores below 65 points:")
-    y -= 40
-    for name in group_students[group_students["Average grade"] < 65]["Name"]:
-        c.drawString(120, y, name)
-        y -= 20
-    
-    c.drawString(100, y - 20, "Students with scores above 95 points:")
-    y -= 40
-    for name in group_students[group_students["Average grade"] > 95]["Name"]:
-        c.drawString(120, y, name)
-        y -= 20
-    
-    c.save()
+    render_report(pdf_path, group, summary)
     print(f"Report saved as {pdf_path}")
 
-if __name__ == "__main__":
+def main():
+    global book
+    parser = argparse.ArgumentParser(description="Student performance analysis")
+    parser.add_argument("--batch", nargs="*", metavar="GROUP",
+                        help="generate reports for the given groups (all groups if none given) and exit")
+    parser.add_argument("--out", default=".", help="folder for batch reports")
+    parser.add_argument("--workers", type=int, default=None, help="processes for batch reports")
+    parser.add_argument("--charts", action="store_true", help="embed the group chart in batch reports")
+    parser.add_argument("--export-charts", metavar="FORMAT", choices=["png", "svg"],
+                        help="save the charts of all groups to --out without a display and exit")
+    args = parser.parse_args()
+    book = GradeBook.load(FILE_PATH)
+    if args.batch is not None:
+        generate_reports(book.summary, args.batch or None, args.out, args.workers, args.charts)
+        return
+    if args.export_charts:
+        export_charts(args.out, args.export_charts)
+        return
+
     while True:
         print("\nChoose an option:")
         print("1. Search for a student by full name")
@@ -143,3 +126,6 @@ if __name__ == "__main__":
             break
         else:
             print("Incorrect choice, try again.")
+
+if __name__ == "__main__":
+    main()
@@ -1,144 +1,405 @@
+import math
+import os
+import threading
 import tkinter as tk
-from tkinter import messagebox, filedialog
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from tkinter import messagebox, filedialog, ttk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
 from reportlab.pdfgen import canvas
 import pandas as pd
 import numpy as np
+from gradebook.storage import load_table
 
-# Upload data from excel file
+# Data file, loaded in the background after the window opens
 file_path = "Processed_LW3.xlsx"
-df = pd.read_excel(file_path)
 
-# Global variable to store graph canvas
+# One figure and canvas for all charts, updated in place instead of recreated
+chart_figure = Figure()
+chart_artists = {}
 graph_canvas = None
 
-# Convert data to dictionary
-students = df.to_dict(orient="records")
-
 # Dynamically identify subject columns based on keywords
 subject_keywords = ["points", "score", "grade"]
-subject_columns = [col for col in df.columns if any(keyword in col.lower() for keyword in subject_keywords)]
+subject_columns = []
+
+def normalize_key(value):
+    """Key used by the store indexes: trimmed, lower-case text"""
+    return str(value).strip().lower()
+
+class StudentStore:
+    """Column arrays of the student table with name and group hash indexes"""
+
+    __slots__ = ("names", "groups", "averages", "scholarship", "scores", "name_index", "group_index")
+
+    def __init__(self, frame, subject_columns):
+        self.names = frame["Name"].astype(str).tolist()
+        self.groups = frame["Group"].tolist()
+        self.averages = frame["Average grade"].to_numpy(dtype=float) if "Average grade" in frame else None
+        self.scholarship = (frame["Scholarship"] == "*").to_numpy() if "Scholarship" in frame else np.zeros(len(frame), bool)
+        # Non-numeric values are shown as 0 on the chart
+        self.scores = frame[subject_columns].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=float)
+        self.name_index = {}
+        self.group_index = {}
+        for pos, (name, group) in enumerate(zip(self.names, self.groups)):
+            self.name_index.setdefault(normalize_key(name), pos)
+            self.group_index.setdefault(normalize_key(group), []).append(pos)
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, name):
+        """Position of the student with this name or None"""
+        return self.name_index.get(normalize_key(name))
+
+    def in_group(self, group):
+        """Positions of the students of the group"""
+        return self.group_index.get(normalize_key(group), [])
+
+    def scholars(self):
+        """Positions of the students with scholarship"""
+        return np.flatnonzero(self.scholarship).tolist()
+
+    def average(self, pos):
+        return "N/A" if self.averages is None else self.averages[pos]
+
+    def has_scholarship(self, pos):
+        return bool(self.scholarship[pos])
+
+    def all_groups(self):
+        return set(self.groups)
+
+    def iter_rows(self, filter_group=None, only_scholarship=False):
+        """Positions matching the report filters, in one pass over the group index or the whole store"""
+        positions = self.in_group(filter_group) if filter_group else range(len(self))
+        for pos in positions:
+            if only_scholarship and not self.scholarship[pos]:
+                continue
+            yield pos
+
+# Compact store with indexes instead of a list of per-row dictionaries, set once loaded
+students = None
+load_task = None  # background job reading the data file
+
+class TaskCancelled(Exception):
+    """Raised inside a background task after the user pressed Cancel"""
+
+class BackgroundTask:
+    """Handle passed to a background job to report progress and check for cancellation"""
+
+    def __init__(self, label, cancellable=True):
+        self.label = label
+        self.cancellable = cancellable  # False for jobs the app needs, like the data load
+        self.future = None
+        self.on_done = None
+        self.progress = None  # (done, total) or None while unknown
+        self.cancel_event = threading.Event()
+
+    def report(self, done, total):
+        self.progress = (done, total)
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+
+class TaskRunner:
+    """Runs heavy jobs on worker threads and delivers results on the Tk thread via after() polling"""
+
+    def __init__(self, root, status_label, progress_bar, workers=2, poll_ms=50):
+        self.root = root
+        self.status_label = status_label
+        self.progress_bar = progress_bar
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.poll_ms = poll_ms
+        self.tasks = []
+        self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, label, job, *args, on_done=None, cancellable=True):
+        """Starts job(task, *args) in the background, on_done(result) is called on the Tk thread"""
+        task = BackgroundTask(label, cancellable)
+        task.on_done = on_done
+        task.future = self.executor.submit(job, task, *args)
+        self.tasks.append(task)
+        return task
+
+    def cancel_all(self):
+        """Cancels the jobs started by the user (reports, charts), not the data load"""
+        for task in self.tasks:
+            if task.cancellable:
+                task.cancel_event.set()
+
+    def _poll(self):
+        for task in [task for task in self.tasks if task.future.done()]:
+            self.tasks.remove(task)
+            try:
+                result = task.future.result()
+            except TaskCancelled:
+                self.status_label.config(text=f"{task.label}: cancelled")
+                continue
+            except Exception as e:
+                self.status_label.config(text=f"{task.label}: failed")
+                messagebox.showerror("Error", f"{task.label} failed: {e}")
+                continue
+            self.status_label.config(text=f"{task.label}: done")
+            if task.on_done:
+                task.on_done(result)
+
+        if self.tasks:
+            task = self.tasks[-1]
+            self.status_label.config(text=f"{task.label}...")
+            if task.progress and task.progress[1]:
+                self.progress_bar.config(mode="determinate", maximum=task.progress[1], value=task.progress[0])
+            else:
+                self.progress_bar.config(mode="indeterminate")
+                self.progress_bar.step()
+        else:
+            self.progress_bar.config(mode="determinate", value=0)
+        self.root.after(self.poll_ms, self._poll)
+
+def load_students(task):
+    """Background job: reads the data file and builds the student store"""
+    df = load_table(file_path)
+    columns = [col for col in df.columns if any(keyword in col.lower() for keyword in subject_keywords)]
+    return StudentStore(df, columns), columns
+
+def on_students_loaded(result):
+    global students, subject_columns
+    students, subject_columns = result
+    student_chart_data.cache_clear()
+    group_chart_data.cache_clear()
+    setup_charts()
+
+def start_loading():
+    global load_task
+    load_task = runner.submit("Loading data", load_students, on_done=on_students_loaded, cancellable=False)
+
+def data_ready():
+    """Tells the user to wait if the data is not loaded yet, offers to load it again if loading failed"""
+    if students is not None:
+        return True
+    if load_task in runner.tasks:
+        messagebox.showinfo("Please wait", "Data is still loading")
+    elif messagebox.askyesno("Data not loaded", f"Loading {file_path} failed. Try again?"):
+        start_loading()
+    return False
 
 def search_student():
     """Search for a student by name"""
+    if not data_ready():
+        return
     name = entry_name.get()
-    result = next((s for s in students if s["Name"].lower() == name.lower()), None)
-    if result:
+    pos = students.find(name)
+    if pos is not None:
         text_result.delete("1.0", tk.END)
-        text_result.insert(tk.END, f"Student: {result['Name']}\nGroup: {result['Group']}\nAverage Note: {result.get('Average grade', 'N/A')}\nScholarship: {'Yes' if result.get('Scholarship') == '*' else 'No'}")
+        text_result.insert(tk.END, f"Student: {students.names[pos]}\nGroup: {students.groups[pos]}\nAverage Note: {students.average(pos)}\nScholarship: {'Yes' if students.has_scholarship(pos) else 'No'}")
     else:
         messagebox.showinfo("Result", "No student found")
 
 def search_group():
     """Search for all students in a specific group"""
+    if not data_ready():
+        return
     group = str(entry_group.get().strip())
-    results = [s for s in students if str(s["Group"]).strip().lower() == group.lower()]
+    results = students.in_group(group)
     if results:
         text_result.delete("1.0", tk.END)
         text_result.insert(tk.END, f"Group: {group}\nTotal Students: {len(results)}\n\n")
-        for student in results:
-            text_result.insert(tk.END, f"{student['Name']} - Avg Score: {student.get('Average grade', 'N/A')} - Scholarship: {'Yes' if student.get('Scholarship') == '*' else 'No'}\n")
+        for pos in results:
+            text_result.insert(tk.END, f"{students.names[pos]} - Avg Score: {students.average(pos)} - Scholarship: {'Yes' if students.has_scholarship(pos) else 'No'}\n")
     else:
-        messagebox.showinfo("Result", f"No students found in group '{group}'. Available groups: {set(df['Group'])}")
+        messagebox.showinfo("Result", f"No students found in group '{group}'. Available groups: {students.all_groups()}")
 
 def show_student_grades():
     """Show a column chart with a specific student's grades."""
     clear_fields()
+    if not data_ready():
+        return
     name = entry_name.get().strip()
-    student = next((s for s in students if str(s["Name"]).strip().lower() == name.lower()), None)
+    pos = students.find(name)
     
-    if not student:
+    if pos is None:
         messagebox.showinfo("Result", "No student found")
         return
     
-    scores = [pd.to_numeric(student.get(subject, 0), errors='coerce') for subject in subject_columns]
-    scores = [0 if np.isnan(score) else score for score in scores]  # Replace NaN with 0
+    name, scores = student_chart_data(pos)
     
     if all(score == 0 for score in scores):
         messagebox.showinfo("Result", "No valid numeric scores available for this student.")
         return
     
-    fig, ax = plt.subplots()
-    ax.bar(subject_columns, scores, color='skyblue')
-    ax.set_xlabel("Subjects")
-    ax.set_ylabel("Scores")
-    ax.set_title(f"Grades of {student['Name']}")
-    ax.set_xticks(range(len(subject_columns)))
-    ax.set_xticklabels(subject_columns, rotation=45, ha="right", fontsize=10)
-    
-    plt.tight_layout()
-    
+    bar_ax, bars = chart_artists["bar"]
+    for bar, score in zip(bars, scores):
+        bar.set_height(score)
+    bar_ax.set_ylim(0, max(scores) * 1.05)
+    bar_ax.set_title(f"Grades of {name}")
+    show_chart("bar")
+
+@lru_cache(maxsize=1024)
+def student_chart_data(pos):
+    """Name and chart scores of the student, memoized per position"""
+    return students.names[pos], tuple(students.scores[pos].tolist())
+
+@lru_cache(maxsize=1024)
+def group_chart_data(group_key):
+    """Scholarship and non-scholarship counts of the group, memoized per normalized group"""
+    group_students = students.in_group(group_key)
+    if not group_students:
+        return None
+    scholarship_count = int(students.scholarship[group_students].sum())
+    return scholarship_count, len(group_students) - scholarship_count
+
+def setup_charts():
+    """Creates the chart artists once; later charts only change their data"""
     global graph_canvas
-    graph_canvas = FigureCanvasTkAgg(fig, master=window)
-    graph_canvas.get_tk_widget().pack()
-    graph_canvas.draw()
+    chart_figure.clear()
+    bar_ax = chart_figure.add_subplot()
+    bars = bar_ax.bar(subject_columns, [0] * len(subject_columns), color='skyblue')
+    bar_ax.set_xlabel("Subjects")
+    bar_ax.set_ylabel("Scores")
+    bar_ax.set_title("Grades of")
+    bar_ax.set_xticks(range(len(subject_columns)))
+    bar_ax.set_xticklabels(subject_columns, rotation=45, ha="right", fontsize=10)
+    chart_figure.tight_layout()
+
+    pie_ax = chart_figure.add_axes([0.1, 0.1, 0.8, 0.8])
+    wedges, labels, percents = pie_ax.pie([1, 1], labels=["Scholarship", "Non-Scholarship"], autopct='%1.1f%%', startangle=140)
+    chart_artists["bar"] = (bar_ax, bars)
+    chart_artists["pie"] = (pie_ax, wedges, labels, percents)
+
+    if graph_canvas is None:
+        graph_canvas = FigureCanvasTkAgg(chart_figure, master=window)
+
+def update_pie(sizes, start_angle=140):
+    """Moves the pie wedges and their labels to the new sizes"""
+    pie_ax, wedges, labels, percents = chart_artists["pie"]
+    total = sum(sizes)
+    theta1 = start_angle
+    for wedge, label, percent, size in zip(wedges, labels, percents, sizes):
+        theta2 = theta1 + 360 * size / total
+        wedge.set_theta1(theta1)
+        wedge.set_theta2(theta2)
+        middle = math.radians((theta1 + theta2) / 2)
+        x, y = math.cos(middle), math.sin(middle)
+        label.set_position((1.1 * x, 1.1 * y))
+        label.set_horizontalalignment("left" if x > 0 else "right")
+        percent.set_position((0.6 * x, 0.6 * y))
+        percent.set_text(f"{100 * size / total:1.1f}%")
+        theta1 = theta2
+
+def show_chart(kind):
+    """Shows the bar or pie axes of the shared figure and redraws it when idle"""
+    chart_artists["bar"][0].set_visible(kind == "bar")
+    chart_artists["pie"][0].set_visible(kind == "pie")
+    widget = graph_canvas.get_tk_widget()
+    if not widget.winfo_ismapped():
+        widget.pack()
+    graph_canvas.draw_idle()
 
 def show_scholar():
     """Show all students with scholarships"""
-    scholars = [s for s in students if s.get("Scholarship") == "*"]
+    if not data_ready():
+        return
+    scholars = students.scholars()
     if scholars:
         text_result.delete("1.0", tk.END)
         text_result.insert(tk.END, "Students with Scholarships:\n\n")
-        for student in scholars:
-            text_result.insert(tk.END, f"{student['Name']} - Group: {student['Group']} - Avg Score: {student.get('Average grade', 'N/A')}\n")
+        for pos in scholars:
+            text_result.insert(tk.END, f"{students.names[pos]} - Group: {students.groups[pos]} - Avg Score: {students.average(pos)}\n")
     else:
         messagebox.showinfo("Result", "No students with scholarships found.")
 
 def generate_report(filter_group=None, only_scholarship=False):
     """Generate a PDF report with student performance."""
+    if not data_ready():
+        return
     filename = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
     if not filename:
         return
-    c = canvas.Canvas(filename)
-    c.drawString(100, 750, "Report with student performance")
-    y = 720
-    for student in students:
-        avg_score = student.get("Average grade", "N/A")
-        scholarship = student.get("Scholarship", " ")
-        if (only_scholarship and scholarship != "*") or (filter_group and student["Group"] != filter_group):
-            continue
-        c.drawString(100, y, f"{student['Name']}, Group: {student['Group']}, Score: {avg_score}")
-        y -= 20
-    c.save()
-    messagebox.showinfo("Ready", f"Report was saved as {filename}")
+    runner.submit("Writing report", write_report, filename, filter_group, only_scholarship,
+                  on_done=lambda saved: messagebox.showinfo("Ready", f"Report was saved as {saved}"))
+
+# Report table layout: (column title, x position)
+REPORT_COLUMNS = [("Name", 50), ("Group", 300), ("Score", 400), ("Scholarship", 480)]
+REPORT_TOP = 800
+REPORT_BOTTOM = 40
+REPORT_ROW = 16
+
+def write_report(task, filename, filter_group=None, only_scholarship=False):
+    """Background job: streams the filtered students into a paginated PDF table.
+
+    Rows are collected for one page at a time and the page is closed with showPage,
+    so drawing state never grows beyond a page. Removes the partial file if cancelled.
+    """
+    try:
+        c = canvas.Canvas(filename, pageCompression=1)
+        total = len(students.in_group(filter_group)) if filter_group else len(students)
+
+        def flush_page(rows, top):
+            # One text object per column is much cheaper than a drawString per cell
+            for col, (title, x) in enumerate(REPORT_COLUMNS):
+                text = c.beginText(x, top)
+                text.setLeading(REPORT_ROW)
+                text.setFont("Helvetica-Bold", 10)
+                text.textLine(title)
+                text.setFont("Helvetica", 10)
+                for row in rows:
+                    text.textLine(row[col])
+                c.drawText(text)
+            c.showPage()
+
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, REPORT_TOP, "Report with student performance")
+        top = REPORT_TOP - 2 * REPORT_ROW
+        rows = []
+        for done, pos in enumerate(students.iter_rows(filter_group, only_scholarship)):
+            if done % 1000 == 0:
+                task.check()
+                task.report(done, total)
+            if top - (len(rows) + 1) * REPORT_ROW < REPORT_BOTTOM:
+                flush_page(rows, top)
+                rows = []
+                top = REPORT_TOP
+            average = students.average(pos)
+            rows.append((
+                str(students.names[pos]),
+                str(students.groups[pos]),
+                average if isinstance(average, str) else f"{average:.2f}",
+                "Yes" if students.has_scholarship(pos) else "No"
+            ))
+        flush_page(rows, top)
+        c.save()
+    except TaskCancelled:
+        if os.path.exists(filename):
+            os.remove(filename)
+        raise
+    return filename
 
 def show_pie_chart_group():
     """Show a pie chart for the selected group."""
     clear_fields()
+    if not data_ready():
+        return
     group = entry_group.get().strip()
     if not group:
         messagebox.showinfo("Error", "Please enter a group number.")
         return
     
-    group_students = df[df["Group"].str.lower() == group.lower()]
-    if group_students.empty:
+    sizes = group_chart_data(normalize_key(group))
+    if sizes is None:
         messagebox.showinfo("Error", f"No data available for group '{group}'.")
         return
     
-    scholarship_count = group_students[group_students["Scholarship"] == "*"].shape[0]
-    non_scholarship_count = group_students.shape[0] - scholarship_count
-    
-    labels = ["Scholarship", "Non-Scholarship"]
-    sizes = [scholarship_count, non_scholarship_count]
-    
-    fig, ax = plt.subplots()
-    ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-    ax.set_title(f"Scholarship Distribution in Group {group}")
-    
-    global graph_canvas
-    graph_canvas = FigureCanvasTkAgg(fig, master=window)
-    graph_canvas.get_tk_widget().pack()
-    graph_canvas.draw()
+    update_pie(sizes)
+    chart_artists["pie"][0].set_title(f"Scholarship Distribution in Group {group}")
+    show_chart("pie")
 
 def clear_fields():
     """Clear text box and graphs while preserving input fields."""
-    global graph_canvas
     text_result.delete("1.0", tk.END)  # Clear text output
     
     if graph_canvas:
-        graph_canvas.get_tk_widget().destroy()
-        graph_canvas = None
+        graph_canvas.get_tk_widget().pack_forget()  # the canvas is kept for the next chart
 
 # Create the main window
 window = tk.Tk()
@@ -201,7 +462,22 @@ label_group_for_report = tk.Label(frame_group, text="Group Filter:", font=("Aria
 label_group_for_report.grid(row=0, column=0, padx=5)
 entry_group_for_report = tk.Entry(frame_group, font=("Arial", 12), width=15)
 entry_group_for_report.grid(row=0, column=1, padx=5)
-btn_report_group_for_report = tk.Button(frame_group, text="Generate PDF (Group)", font=("Arial", 12, "bold"), bg="#993366", fg="white", command=lambda: generate_report(filter_group=entry_group.get()))
+btn_report_group_for_report = tk.Button(frame_group, text="Generate PDF (Group)", font=("Arial", 12, "bold"), bg="#993366", fg="white", command=lambda: generate_report(filter_group=entry_group_for_report.get().strip()))
 btn_report_group_for_report.grid(row=0, column=2, padx=5)
 
+# Status bar for background tasks
+frame_status = tk.Frame(window, bg="#adade8")
+frame_status.pack(pady=5)
+
+label_status = tk.Label(frame_status, text="", font=("Arial", 10), bg="#adade8", width=30, anchor="w")
+label_status.grid(row=0, column=0, padx=5)
+progress_bar = ttk.Progressbar(frame_status, length=200)
+progress_bar.grid(row=0, column=1, padx=5)
+btn_cancel = tk.Button(frame_status, text="Cancel", font=("Arial", 10), command=lambda: runner.cancel_all())
+btn_cancel.grid(row=0, column=2, padx=5)
+
+# The window opens at once, the data is read in the background
+runner = TaskRunner(window, label_status, progress_bar)
+start_loading()
+
 window.mainloop()
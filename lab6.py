@@ -3,6 +3,9 @@ from tkinter import filedialog, messagebox, scrolledtext
 import google.generativeai as genai
 import json
 import os
+import queue
+import threading
+from code_analyzer import stream_source
 
 # Load API key from config.json
 def load_api_key():
@@ -21,29 +24,77 @@ def load_api_key():
 API_KEY = load_api_key()
 genai.configure(api_key=API_KEY)
 
-# Analyze code for vulnerabilities
-def analyze_code(code):
+# stream_source (from code_analyzer) reuses one model client, caches results on disk
+# and splits large Python code into function/class units analyzed separately.
+# It runs on a worker thread; the Tk loop polls its chunks from a queue.
+POLL_MS = 50
+cancel_event = None
+
+def run_analysis(code, cancel, chunks):
+    """Worker thread: puts streamed result chunks into the queue, then None"""
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(
-            f"Analyze the following code for potential security vulnerabilities. List the risks and suggest fixes:\n{code}"
-        )
-        return response.text if response.text else "No vulnerabilities detected."
+        for chunk in stream_source(code, cancel=cancel):
+            chunks.put(chunk)
     except Exception as e:
-        return f"Error analyzing code: {e}"
+        chunks.put(f"Error analyzing code: {e}")
+    chunks.put(None)
+
+def append_output(text):
+    output_text.config(state="normal")  # Enable editing to update text
+    output_text.insert(tk.END, text)
+    output_text.see(tk.END)
+    output_text.config(state="disabled")  # Disable text editing
+
+def finish_analysis():
+    analyze_button.config(state="normal")
+    cancel_button.config(state="disabled")
+
+def poll_output(chunks, cancel):
+    """Appends the chunks received so far and polls again until the stream ends"""
+    if cancel.is_set():
+        return
+    received = []
+    done = False
+    while True:
+        try:
+            chunk = chunks.get_nowait()
+        except queue.Empty:
+            break
+        if chunk is None:
+            done = True
+            break
+        received.append(chunk)
+    if received:
+        append_output("".join(received))
+    if done:
+        finish_analysis()
+    else:
+        root.after(POLL_MS, poll_output, chunks, cancel)
 
 # Analyzing text input
 def analyze_text():
+    global cancel_event
     code = text_input.get("1.0", tk.END).strip()
     if code:
-            result = analyze_code(code)
-            output_text.config(state="normal")  # Enable editing to update text
+            output_text.config(state="normal")
             output_text.delete("1.0", tk.END)
-            output_text.insert("1.0", result)
-            output_text.config(state="disabled")  # Disable text editing
+            output_text.config(state="disabled")
+            analyze_button.config(state="disabled")
+            cancel_button.config(state="normal")
+            cancel_event = threading.Event()
+            chunks = queue.Queue()
+            threading.Thread(target=run_analysis, args=(code, cancel_event, chunks), daemon=True).start()
+            root.after(POLL_MS, poll_output, chunks, cancel_event)
     else:
             messagebox.showwarning("Error", "Please enter some code!")
 
+# Stops showing the current analysis; the worker drops the rest of the stream
+def cancel_analysis():
+    if cancel_event is not None and not cancel_event.is_set():
+        cancel_event.set()
+        append_output("\n[Analysis cancelled]")
+        finish_analysis()
+
 # Loading code from a file
 def load_file():
     file_path = filedialog.askopenfilename(filetypes=[("Python Files", "*.py"), ("All Files", "*.*")])
@@ -84,7 +135,10 @@ text_input = scrolledtext.ScrolledText(frame, height=10, width=60,
 text_input.pack(pady=5)
 
 tk.Button(frame, text="Upload File", command=load_file, bg=btn_color, font=font_medium, padx=10, pady=5).pack(pady=5)
-tk.Button(frame, text="Analyze Code", command=analyze_text, bg=btn_color, font=font_medium, padx=10, pady=5).pack(pady=5)
+analyze_button = tk.Button(frame, text="Analyze Code", command=analyze_text, bg=btn_color, font=font_medium, padx=10, pady=5)
+analyze_button.pack(pady=5)
+cancel_button = tk.Button(frame, text="Cancel", command=cancel_analysis, bg=btn_color, font=font_medium, padx=10, pady=5, state="disabled")
+cancel_button.pack(pady=5)
 
 result_label = tk.Label(frame, text="Results will be displayed here", 
                         wraplength=500, 
@@ -0,0 +1,201 @@
+"""
+Per-stage timing for the processing scripts (lab2, lab3).
+
+Off by default: stage() then returns a shared no-op object and profiled
+functions only check one flag. Turn it on with the LAB_PROFILE environment
+variable or the --profile flag of the scripts:
+    LAB_PROFILE=1 python lab2.py big_LW2.txt out.txt
+    LAB_PROFILE=cprofile,tracemalloc python lab3.py
+
+For every stage it records wall time, CPU time, rows processed and the change of
+resident memory. At exit a summary table is printed to stderr and the metrics
+are written as JSON to LAB_PROFILE_DIR (default: "profile"). With "cprofile" each
+top-level stage is also dumped as a .prof file (open with pstats or snakeviz),
+with "tracemalloc" the Python allocation peak of each stage is recorded and its
+top allocation sites are dumped as text.
+"""
+
+import atexit
+import datetime
+import functools
+import json
+import os
+import sys
+import time
+
+PROFILE_DIR = os.environ.get("LAB_PROFILE_DIR", "profile")
+TOP_ALLOCATIONS = 15
+
+_enabled = False
+_options = set()
+_records = []
+_depth = 0
+_t0 = time.perf_counter()
+
+def _rss_mb():
+    """Current resident memory in MB (Linux /proc), else the peak from resource, else None"""
+    try:
+        with open("/proc/self/statm", "rb") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+def _safe_name(name):
+    return "".join(char if char.isalnum() or char in "-_." else "_" for char in name)
+
+def enable(options=("timing",)):
+    """Turns profiling on; options may include "cprofile" and "tracemalloc" """
+    global _enabled
+    if "tracemalloc" in options:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    if not _enabled:
+        atexit.register(report)
+    _enabled = True
+    _options.update(options)
+
+def is_enabled():
+    return _enabled
+
+class _NullStage:
+    """Stands in for a stage while profiling is off"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+class _Stage:
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows  # may be set inside the with block, once the count is known
+
+    def __enter__(self):
+        global _depth
+        self.depth = _depth
+        _depth += 1
+        self.profiler = None
+        if "cprofile" in _options and self.depth == 0:  # only one profiler may run at a time
+            import cProfile
+            self.profiler = cProfile.Profile()
+        if "tracemalloc" in _options:
+            import tracemalloc
+            self.traced_start = tracemalloc.get_traced_memory()[0]
+            if self.depth == 0:
+                tracemalloc.reset_peak()
+        self.rss_start = _rss_mb()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        global _depth
+        if self.profiler is not None:
+            self.profiler.disable()
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        rss_end = _rss_mb()
+        _depth -= 1
+        record = {
+            "stage": self.name,
+            "depth": self.depth,
+            "start_s": round(self.wall_start - _t0, 6),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "rows": self.rows,
+            "rows_per_s": round(self.rows / wall, 1) if self.rows is not None and wall > 0 else None,
+            "mem_delta_mb": None if rss_end is None or self.rss_start is None else round(rss_end - self.rss_start, 2),
+            "failed": exc[0] is not None
+        }
+        if "tracemalloc" in _options:
+            import tracemalloc
+            current, peak = tracemalloc.get_traced_memory()
+            record["py_mem_delta_mb"] = round((current - self.traced_start) / 2 ** 20, 2)
+            if self.depth == 0:
+                record["py_peak_mb"] = round(peak / 2 ** 20, 2)
+                self._dump_allocations(tracemalloc.take_snapshot())
+        if self.profiler is not None:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            self.profiler.dump_stats(os.path.join(PROFILE_DIR, f"{_safe_name(self.name)}.prof"))
+        _records.append(record)
+        return False
+
+    def _dump_allocations(self, snapshot):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, f"{_safe_name(self.name)}.tracemalloc.txt"), "w", encoding="utf-8") as file:
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                file.write(f"{stat}\n")
+
+def stage(name, rows=None):
+    """Context manager timing one pipeline stage; set .rows inside the block if it is not known before.
+
+        with stage("clean_data") as current:
+            cleaned = clean_data(data)
+            current.rows = len(cleaned)
+    """
+    return _Stage(name, rows) if _enabled else _NULL_STAGE
+
+def profiled(name=None, rows=None):
+    """Decorator form of stage(); rows is a function of the result giving the row count (e.g. len)"""
+    def decorate(function):
+        stage_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Stage(stage_name) as current:
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    current.rows = rows(result)
+            return result
+        return wrapper
+    return decorate
+
+def records():
+    """Metrics recorded so far, in the order the stages finished; start_s is relative to import"""
+    return list(_records)
+
+def format_table(items):
+    header = f"{'stage':<36}{'wall s':>10}{'cpu s':>10}{'rows':>12}{'rows/s':>14}{'mem MB':>10}"
+    lines = [header, "-" * len(header)]
+    for item in items:
+        name = "  " * item["depth"] + item["stage"] + (" (failed)" if item["failed"] else "")
+        rows = "" if item["rows"] is None else f"{item['rows']:,}"
+        speed = "" if item["rows_per_s"] is None else f"{item['rows_per_s']:,.0f}"
+        memory = "" if item["mem_delta_mb"] is None else f"{item['mem_delta_mb']:+.1f}"
+        lines.append(f"{name:<36}{item['wall_s']:>10.3f}{item['cpu_s']:>10.3f}{rows:>12}{speed:>14}{memory:>10}")
+    return "\n".join(lines)
+
+def report():
+    """Prints the summary table to stderr and writes the metrics JSON; called at exit"""
+    if not _records:
+        return None
+    # Stages finish inner first; sort by start so parents come before their children
+    ordered = sorted(_records, key=lambda item: (item["start_s"], item["depth"]))
+    print(format_table(ordered), file=sys.stderr)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+    path = os.path.join(PROFILE_DIR, f"{script}_metrics.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"script": script, "argv": sys.argv[1:], "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                   "options": sorted(_options), "stages": ordered}, file, ensure_ascii=False, indent=2)
+    print(f"Profile metrics saved to {path}", file=sys.stderr)
+    return path
+
+_env = os.environ.get("LAB_PROFILE", "").strip().lower()
+if _env and _env not in ("0", "false", "no", "off"):
+    enable({"timing"} | {option.strip() for option in _env.split(",")} - {"1", "true", "yes", "on"})
@@ -0,0 +1,140 @@
+"""
+Local checks for risky code patterns, run before sending code to the model.
+
+Python sources are checked on the AST; other or unparsable sources with
+line regexes. Findings only mark code as suspicious: the model still does the
+actual analysis of the flagged regions, while clean code is not sent at all.
+"""
+
+import ast
+import re
+
+SQL_METHODS = {"execute", "executemany", "executescript", "read_sql", "read_sql_query"}
+SHELL_FUNCTIONS = {("os", "system"), ("os", "popen")}
+UNSAFE_LOADERS = {("pickle", "load"), ("pickle", "loads"), ("marshal", "loads")}
+REQUEST_FIELDS = {"args", "form", "values", "json", "data", "cookies", "files", "GET", "POST"}
+SECRET_NAME = re.compile(r"pass(word|wd)?|secret|token|api_?key|access_?key|private_?key", re.I)
+
+# Checked on the raw text of every source, Python or not
+SECRET_PATTERNS = [
+    ("hard-coded-key", re.compile(r"AIza[0-9A-Za-z_\-]{35}"), "Google API key in source"),
+    ("hard-coded-key", re.compile(r"\bAKIA[0-9A-Z]{16}\b"), "AWS access key in source"),
+    ("hard-coded-key", re.compile(r"-----BEGIN [A-Z ]*PRIVATE KEY-----"), "private key in source"),
+]
+
+# Fallback for sources that are not valid Python
+LINE_PATTERNS = [
+    ("sql-injection", re.compile(r"\.execute\w*\s*\(.*(\+|%|\bf[\"']|\.format\()"), "SQL built from strings"),
+    ("eval", re.compile(r"\b(eval|exec)\s*\("), "eval/exec call"),
+    ("shell", re.compile(r"shell\s*=\s*True|\bos\.(system|popen)\s*\("), "shell command"),
+    ("hard-coded-key", re.compile(r"(?i)(pass(word|wd)?|secret|token|api_?key)\w*[\"']?\s*[:=]\s*[\"'][^\"']{4,}[\"']"),
+     "hard-coded secret"),
+    ("untrusted-input", re.compile(r"\brequest\.(args|form|values|json|cookies|GET|POST)\b"), "request data used"),
+]
+
+def _dotted(node):
+    """("os", "system") for os.system, ("", "eval") for eval, ("*", "execute") for self.db.execute"""
+    if isinstance(node, ast.Name):
+        return "", node.id
+    if isinstance(node, ast.Attribute):
+        owner = node.value.id if isinstance(node.value, ast.Name) else "*"
+        return owner, node.attr
+    return None
+
+def _is_str(node):
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+def _built_string(node, tainted):
+    """True for strings built at run time: concatenation, %, .format() or f-strings"""
+    if isinstance(node, ast.JoinedStr):
+        return any(isinstance(value, ast.FormattedValue) for value in node.values)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        parts = (node.left, node.right)
+        if all(_is_str(part) for part in parts):
+            return False
+        return any(_is_str(part) or _built_string(part, tainted) for part in parts)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod):
+        return _is_str(node.left) or _built_string(node.left, tainted)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "format":
+        return True
+    return isinstance(node, ast.Name) and node.id in tainted
+
+def _target_names(target):
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, ast.Attribute):
+        return [target.attr]
+    return []
+
+def _check_tree(tree):
+    findings = []
+
+    def add(rule, node, message):
+        findings.append({"rule": rule, "line": node.lineno, "message": message})
+
+    # Names assigned a built string anywhere in the file (e.g. query = "..." + name)
+    tainted = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and _built_string(node.value, tainted):
+            for target in node.targets:
+                tainted.update(_target_names(target))
+        elif isinstance(node, ast.AugAssign) and isinstance(node.op, (ast.Add, ast.Mod)):
+            if not _is_str(node.value):
+                tainted.update(_target_names(node.target))
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            callee = _dotted(node.func)
+            if callee is None:
+                continue
+            owner, name = callee
+            if name in SQL_METHODS and owner and node.args and _built_string(node.args[0], tainted):
+                add("sql-injection", node, f"{name}() with SQL built from strings")
+            elif not owner and name in ("eval", "exec"):
+                add("eval", node, f"{name}() call")
+            elif callee in SHELL_FUNCTIONS:
+                add("shell", node, f"{owner}.{name}() runs a shell command")
+            elif callee in UNSAFE_LOADERS:
+                add("unsafe-load", node, f"{owner}.{name}() on possibly untrusted data")
+            for keyword in node.keywords:
+                if keyword.arg == "shell" and isinstance(keyword.value, ast.Constant) and keyword.value.value is True:
+                    add("shell", node, f"{name}() with shell=True")
+                elif keyword.arg and SECRET_NAME.search(keyword.arg) and _is_str(keyword.value) and keyword.value.value:
+                    add("hard-coded-key", node, f"hard-coded value for {keyword.arg}=")
+        elif isinstance(node, ast.Assign) and _is_str(node.value) and node.value.value:
+            names = [name for target in node.targets for name in _target_names(target)]
+            if any(SECRET_NAME.search(name) for name in names):
+                add("hard-coded-key", node, f"hard-coded value for {names[0]}")
+        elif isinstance(node, ast.Dict):
+            for key, value in zip(node.keys, node.values):
+                if _is_str(key) and SECRET_NAME.search(key.value) and _is_str(value) and value.value:
+                    add("hard-coded-key", key, f"hard-coded value for '{key.value}'")
+        elif isinstance(node, ast.Attribute) and node.attr in REQUEST_FIELDS:
+            if isinstance(node.value, ast.Name) and node.value.id == "request":
+                add("untrusted-input", node, f"request.{node.attr} used")
+    return findings
+
+def _check_lines(lines, patterns):
+    findings = []
+    for number, line in enumerate(lines, 1):
+        for rule, pattern, message in patterns:
+            if pattern.search(line):
+                findings.append({"rule": rule, "line": number, "message": message})
+    return findings
+
+def check_source(source):
+    """Returns the risky patterns found in source as dicts with "rule", "line" and "message".
+
+    An empty list means the source looks clean to the local checks.
+    """
+    lines = source.splitlines()
+    try:
+        findings = _check_tree(ast.parse(source))
+    except (SyntaxError, ValueError):
+        findings = _check_lines(lines, LINE_PATTERNS)
+    findings += _check_lines(lines, SECRET_PATTERNS)
+    unique = {(finding["line"], finding["rule"]): finding for finding in findings}
+    return sorted(unique.values(), key=lambda finding: (finding["line"], finding["rule"]))
+
+def format_findings(findings):
+    return "\n".join(f"line {finding['line']}: {finding['message']} [{finding['rule']}]" for finding in findings)
@@ -0,0 +1,34 @@
+from benchmarks import generate_grade_book
+from gradebook.book import GradeBook, build_indexes
+from gradebook.grading import prepare_analysis
+
+def make_book(rows=200, seed=4):
+    return GradeBook(*prepare_analysis(generate_grade_book(rows, seed=seed)))
+
+def test_rename_moves_the_student_in_the_indexes():
+    book = make_book()
+    counts = book.df["Name"].value_counts()
+    old_name = counts[counts == 1].index[0]
+    assert book.update_student(old_name, Name="Zyxwv Qkjh")
+
+    assert book.find_exact("zyxwv qkjh")["Name"].tolist() == ["Zyxwv Qkjh"]
+    assert book.find("xwv qk")["Name"].tolist() == ["Zyxwv Qkjh"]
+    assert old_name not in book.find(old_name)["Name"].tolist()
+    assert old_name.lower() not in book.index["name"]
+
+    fresh = build_indexes(book.df)
+    assert book.index["keys"] == fresh["keys"]
+    assert book.index["name"] == fresh["name"]
+    assert book.index["trigram"] == fresh["trigram"]
+
+def test_update_refreshes_group_summary_and_charts():
+    book = make_book()
+    name, group = book.df["Name"].iat[3], book.df["Group"].iat[3]
+    count = book.summary[group]["count"]
+    version = book.version
+    assert book.update_student(name, Group="New group")
+
+    assert book.summary["New group"]["count"] == 1
+    assert book.summary.get(group, {"count": 0})["count"] == count - 1
+    assert book.version == version + 1
+    assert not book.update_student("nobody at all")
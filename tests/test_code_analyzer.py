@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+
+import pytest
+
+import code_analyzer
+from code_analyzer import (LOCAL_CLEAN, AnalysisCache, HttpModel, HttpResponse, RateLimiter, analyze_code,
+                           analyze_units, cache_key, merge_results, request_analysis, stream_analysis,
+                           stream_source)
+
+class StubModel:
+    """Answers every prompt with a numbered result and counts the calls"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        return HttpResponse(f"result {len(self.prompts)}")
+
+def test_cache_hit_skips_the_model(tmp_path):
+    model, cache = StubModel(), AnalysisCache(str(tmp_path / "cache.sqlite"))
+    assert analyze_code("x = 1\n", model, cache) == "result 1"
+    # Same code up to line endings and trailing spaces is the same entry
+    assert analyze_code("x = 1  \r\n\n", model, cache) == "result 1"
+    assert len(model.prompts) == 1
+    assert analyze_code("x = 2", model, cache) == "result 2"
+
+def test_expired_entries_are_analyzed_again(tmp_path, monkeypatch):
+    model, cache = StubModel(), AnalysisCache(str(tmp_path / "cache.sqlite"), ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr(code_analyzer.time, "time", lambda: now[0])
+    analyze_code("x = 1", model, cache)
+    now[0] += 59
+    assert analyze_code("x = 1", model, cache) == "result 1"
+    now[0] += 2
+    assert cache.get(cache_key("x = 1")) is None
+    assert analyze_code("x = 1", model, cache) == "result 2"
+
+def test_least_recently_used_entry_is_evicted(tmp_path, monkeypatch):
+    model, cache = StubModel(), AnalysisCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    now = [1000.0]
+    monkeypatch.setattr(code_analyzer.time, "time", lambda: now[0])
+    for code in ("a = 1", "b = 2"):
+        analyze_code(code, model, cache)
+        now[0] += 1
+    analyze_code("a = 1", model, cache)  # hit: "b = 2" is now the least recently used
+    now[0] += 1
+    analyze_code("c = 3", model, cache)
+    assert cache.get(cache_key("b = 2")) is None
+    assert cache.get(cache_key("a = 1")) == "result 1"
+    assert cache.get(cache_key("c = 3")) == "result 3"
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Model endpoint failing the first server.failures requests with 503"""
+
+    def do_POST(self):
+        prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["prompt"]
+        self.server.times.append(time.monotonic())
+        if len(self.server.times) <= self.server.failures:
+            self.send_error(503)
+            return
+        body = json.dumps({"text": f"checked {len(prompt)} chars"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def model_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    server.times, server.failures = [], 0
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def server_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+def test_http_model_retries_failed_requests(tmp_path, model_server):
+    model_server.failures = 2
+    cache = AnalysisCache(str(tmp_path / "cache.sqlite"))
+    result, cached = request_analysis("x = 1", HttpModel(server_url(model_server)), cache, retries=2, backoff=0)
+    assert result.startswith("checked") and not cached
+    assert len(model_server.times) == 3
+
+def test_http_model_gives_up_after_the_retries(tmp_path, model_server):
+    model_server.failures = 5
+    cache = AnalysisCache(str(tmp_path / "cache.sqlite"))
+    with pytest.raises(HTTPError):
+        request_analysis("x = 1", HttpModel(server_url(model_server)), cache, retries=1, backoff=0)
+    assert len(model_server.times) == 2
+    assert cache.get(cache_key("x = 1")) is None  # errors are not cached
+
+def test_rate_limiter_spaces_out_requests(tmp_path, model_server):
+    rate = 20.0
+    model, limiter = HttpModel(server_url(model_server)), RateLimiter(rate)
+    cache = AnalysisCache(str(tmp_path / "cache.sqlite"))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda n: request_analysis(f"x = {n}", model, cache, limiter), range(6)))
+    times = sorted(model_server.times)
+    assert len(times) == 6
+    assert times[-1] - times[0] >= 5 / rate * 0.9
+
+class StreamModel:
+    """Streams the answer in the given chunks, remembering how many were produced"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.produced = 0
+
+    def generate_content(self, prompt, stream=False):
+        assert stream
+        for text in self.chunks:
+            self.produced += 1
+            yield HttpResponse(text)
+
+def test_stream_keeps_chunk_order_and_caches_the_text(tmp_path):
+    model = StreamModel(["Risk: ", "", "SQL injection", " on line 3."])
+    cache = AnalysisCache(str(tmp_path / "c.sqlite"))
+    assert list(stream_analysis("x = 1", model, cache)) == ["Risk: ", "SQL injection", " on line 3."]
+    assert cache.get(cache_key("x = 1")) == "Risk: SQL injection on line 3."
+    # A cached result comes back as one chunk, without calling the model
+    assert list(stream_analysis("x = 1", StreamModel([]), cache)) == ["Risk: SQL injection on line 3."]
+
+def test_cancelled_stream_stops_and_is_not_cached(tmp_path):
+    model, cache = StreamModel(["a", "b", "c", "d"]), AnalysisCache(str(tmp_path / "c.sqlite"))
+    cancel = threading.Event()
+    received = []
+    for chunk in stream_analysis("x = 1", model, cache, cancel):
+        received.append(chunk)
+        if len(received) == 2:
+            cancel.set()
+    assert received == ["a", "b"]
+    assert model.produced == 3  # the chunk in flight when the event was set is dropped
+    assert cache.get(cache_key("x = 1")) is None
+
+class CountingCache(AnalysisCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return super().get(key)
+
+def risky_source(functions=6, risky=(1, 4)):
+    """A source long enough to be split, with SQL built from strings in the given functions"""
+    parts = []
+    for number in range(functions):
+        body = [f"def f{number}(cursor, name):"]
+        if number in risky:
+            body.append("    cursor.execute('SELECT * FROM users WHERE name = ' + name)")
+        body += [f"    total = {line}" for line in range(15)] + ["    return total"]
+        parts.append("\n".join(body))
+    return "\n\n".join(parts) + "\n"
+
+def test_units_are_looked_up_once(tmp_path):
+    model, cache = StubModel(), CountingCache(str(tmp_path / "cache.sqlite"))
+    source = risky_source()
+    units = analyze_units(source, model, cache)
+    assert cache.gets == 2 and [unit["cached"] for unit in units if not unit["skipped"]] == [False, False]
+    units = analyze_units(source, model, cache)
+    assert cache.gets == 4 and [unit["cached"] for unit in units if not unit["skipped"]] == [True, True]
+    assert len(model.prompts) == 2
+
+def test_clean_units_share_one_summary_line(tmp_path):
+    model, cache = StubModel(), AnalysisCache(str(tmp_path / "cache.sqlite"))
+    report = merge_results(analyze_units(risky_source(), model, cache))
+    assert report.count("Lines ") == 2
+    assert report.splitlines()[-1].startswith("No vulnerabilities detected in lines 1-17, ")
+    assert LOCAL_CLEAN not in report
+
+def test_streamed_report_matches_the_merged_report(tmp_path):
+    source = risky_source()
+    merged = merge_results(analyze_units(source, StubModel(), AnalysisCache(str(tmp_path / "a.sqlite"))))
+    streamed = "".join(stream_source(source, StreamModel(["result 1"]), AnalysisCache(str(tmp_path / "b.sqlite"))))
+    assert streamed.replace("result 1", "") == merged.replace("result 1", "").replace("result 2", "")
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from benchmarks import generate_grade_book, write_grade_book
+from gradebook.grading import process_grades
+from gradebook.incremental import update_processed
+from gradebook.storage import load_table, save_table
+
+def assert_matches_full_run(input_path, output_path):
+    expected = process_grades(load_table(input_path)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(load_table(output_path).astype(str), expected.astype(str))
+
+def edit_grades(df, rows, value="100"):
+    subject = [col for col in df.columns if "points" in col.lower()][0]
+    df[subject] = df[subject].astype(object)
+    df.loc[df.index[rows], subject] = value
+    return df
+
+def test_cache_only_input_is_picked_up(tmp_path):
+    """No workbook at all: the input only exists as the columnar cache"""
+    input_path, output_path = str(tmp_path / "in.xlsx"), str(tmp_path / "out.xlsx")
+    save_table(generate_grade_book(300, seed=1), input_path)
+    assert update_processed(input_path, output_path)["full"]
+
+    save_table(edit_grades(load_table(input_path), [0, 5, 7]), input_path)
+    stats = update_processed(input_path, output_path)
+    assert stats["changed"] == 3
+    assert_matches_full_run(input_path, output_path)
+
+def test_cache_newer_than_workbook_is_picked_up(tmp_path):
+    """The workbook exists but the edit is saved to the cache only (lab3 default)"""
+    input_path, output_path = str(tmp_path / "in.xlsx"), str(tmp_path / "out.xlsx")
+    write_grade_book(input_path, 300, seed=2)
+    update_processed(input_path, output_path)
+
+    df = load_table(input_path)
+    df = pd.concat([edit_grades(df, [1, 2]), generate_grade_book(5, seed=3)], ignore_index=True)
+    save_table(df, input_path, excel=False)
+    stats = update_processed(input_path, output_path)
+    assert stats["changed"] == 2 and stats["added"] > 0
+    assert_matches_full_run(input_path, output_path)
+
+def test_unchanged_input_does_no_work(tmp_path):
+    input_path, output_path = str(tmp_path / "in.xlsx"), str(tmp_path / "out.xlsx")
+    save_table(generate_grade_book(200, seed=4), input_path)
+    update_processed(input_path, output_path)
+    assert update_processed(input_path, output_path)["parts_written"] == 0
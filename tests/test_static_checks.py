@@ -0,0 +1,27 @@
+import os
+
+from static_checks import check_source
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def rules(source):
+    return [(finding["line"], finding["rule"]) for finding in check_source(source)]
+
+def test_string_built_query_in_test1():
+    with open(os.path.join(ROOT, "test1.py"), "r", encoding="utf-8") as file:
+        assert rules(file.read()) == [(6, "sql-injection")]
+
+def test_f_string_query():
+    source = "def find(cursor, name):\n    cursor.execute(f\"SELECT * FROM users WHERE name = '{name}'\")\n"
+    assert rules(source) == [(2, "sql-injection")]
+
+def test_parameterized_query_is_clean():
+    assert rules("cursor.execute('SELECT * FROM users WHERE name = ?', (name,))\n") == []
+
+def test_shell_true():
+    source = "import subprocess\n\nsubprocess.run('ls ' + path, shell=True)\n"
+    assert rules(source) == [(3, "shell")]
+
+def test_clean_file():
+    source = "import json\n\ndef load(path):\n    with open(path) as file:\n        return json.load(file)\n"
+    assert check_source(source) == []
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from gradebook.grading import process_grades
+from gradebook.incremental import export_processed, update_processed
+from gradebook.storage import load_table, save_table
+
+def write_mixed_book(path):
+    """Groups as Excel stores them: numbers next to text such as "535ст2" """
+    pd.DataFrame({"Name": ["Ann", "Bob", "Cid"], "Group": [342, "535ст2", 342],
+                  "Math points": [90, 70, 55]}).to_excel(path, index=False)
+
+def test_cache_keeps_mixed_columns_as_text(tmp_path):
+    path = str(tmp_path / "in.xlsx")
+    write_mixed_book(path)
+    assert load_table(path)["Group"].tolist() == ["342", "535ст2", "342"]
+
+def test_excel_export_restores_cell_types(tmp_path):
+    input_path, output_path = str(tmp_path / "in.xlsx"), str(tmp_path / "out.xlsx")
+    write_mixed_book(input_path)
+    save_table(process_grades(load_table(input_path)), output_path, excel=True, like=input_path)
+    assert pd.read_excel(output_path)["Group"].tolist() == [342, "535ст2", 342]
+
+def test_incremental_export_restores_cell_types(tmp_path):
+    input_path, output_path = str(tmp_path / "in.xlsx"), str(tmp_path / "out.xlsx")
+    write_mixed_book(input_path)
+    update_processed(input_path, output_path)
+    export_processed(output_path, like=input_path)
+    assert pd.read_excel(output_path)["Group"].tolist() == [342, "535ст2", 342]